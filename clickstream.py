@@ -0,0 +1,398 @@
+"""Route popularity from search and booking event logs, held in fixed-size sketches.
+
+Events are streamed from JSONL files, one object per line:
+
+    {"ts": "2026-10-19T08:30:00", "event": "search", "origin": "Sydney",
+     "destination": "Melbourne", "user_id": "u-1842"}
+
+Per-route search and booking counts go into count-min sketches and unique
+users into HyperLogLog sketches, one set per ISO week. Sketches merge
+across worker processes and weeks. Each log directory is folded into one
+rolling aggregate that keeps only the latest weeks, so memory stays
+bounded however large the logs grow.
+
+    python clickstream.py ingest logs/ --processes 4
+    python clickstream.py benchmark --events 2000000 --files 4 --processes 4
+"""
+import argparse
+import glob
+import io
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from data_sources import AUSTRALIAN_AIRPORTS, DataSourceBackend
+
+# pandas' vectorized hash takes a 16-character key; different keys give independent hashes
+_ROUTE_HASH_KEYS = ('route-sketch-key', 'route-sketch-alt')
+_USER_HASH_KEY = 'unique-users-key'
+
+
+def iso_week(day: date) -> str:
+    """Window label for the ISO week containing a day, e.g. '2026-W42'"""
+    year, week, _ = day.isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def complete_weeks(weeks: int, now: Optional[datetime] = None) -> List[str]:
+    """Labels of the `weeks` full ISO weeks before the one containing now, oldest first"""
+    today = (now or datetime.now()).date()
+    return [iso_week(today - timedelta(weeks=offset)) for offset in range(weeks, 0, -1)]
+
+
+def hash_keys(keys: Iterable, hash_key: str) -> np.ndarray:
+    """64-bit hashes for an array of keys"""
+    return pd.util.hash_array(np.asarray(keys, dtype=object), hash_key=hash_key, categorize=False)
+
+
+class CountMinSketch:
+    """Approximate counts per key in a fixed depth x width table; estimates never undercount"""
+
+    def __init__(self, width: int = 2048, depth: int = 4):
+        self.width = width
+        self.depth = depth
+        self.table = np.zeros((depth, width), dtype=np.uint64)
+
+    def _columns(self, keys: Iterable) -> np.ndarray:
+        # Double hashing: row i uses h1 + i * h2
+        h1 = hash_keys(keys, _ROUTE_HASH_KEYS[0])
+        h2 = hash_keys(keys, _ROUTE_HASH_KEYS[1]) | np.uint64(1)
+        rows = np.arange(self.depth, dtype=np.uint64)[:, None]
+        return ((h1[None, :] + rows * h2[None, :]) % np.uint64(self.width)).astype(np.intp)
+
+    def add(self, keys: Iterable, counts: Optional[np.ndarray] = None):
+        keys = np.asarray(keys, dtype=object)
+        counts = np.ones(len(keys)) if counts is None else np.asarray(counts, dtype=float)
+        for row, columns in enumerate(self._columns(keys)):
+            self.table[row] += np.bincount(columns, weights=counts, minlength=self.width).astype(np.uint64)
+
+    def estimate(self, keys: Iterable) -> np.ndarray:
+        columns = self._columns(keys)
+        return self.table[np.arange(self.depth)[:, None], columns].min(axis=0)
+
+    def merge(self, other: 'CountMinSketch'):
+        if self.table.shape != other.table.shape:
+            raise ValueError("Cannot merge count-min sketches of different sizes")
+        self.table += other.table
+
+
+class HyperLogLog:
+    """Approximate distinct count in 2**precision one-byte registers (about 1.6% error at 12)"""
+
+    def __init__(self, precision: int = 12):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    @staticmethod
+    def _leading_zeros(values: np.ndarray) -> np.ndarray:
+        """Count leading zero bits of non-zero uint64 values by binary search"""
+        zeros = np.zeros(values.shape, dtype=np.uint8)
+        for shift in (32, 16, 8, 4, 2, 1):
+            top_clear = values < (np.uint64(1) << np.uint64(64 - shift))
+            zeros[top_clear] += shift
+            values = np.where(top_clear, values << np.uint64(shift), values)
+        return zeros
+
+    def add_hashes(self, hashes: np.ndarray):
+        p = np.uint64(self.precision)
+        buckets = (hashes >> (np.uint64(64) - p)).astype(np.intp)
+        # A sentinel bit keeps the remainder non-zero so the rank is bounded
+        remainder = (hashes << p) | (np.uint64(1) << (p - np.uint64(1)))
+        np.maximum.at(self.registers, buckets, self._leading_zeros(remainder) + 1)
+
+    def estimate(self) -> float:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.exp2(-self.registers.astype(float)))
+        empty = np.count_nonzero(self.registers == 0)
+        if raw <= 2.5 * m and empty:
+            # Linear counting is more accurate for small cardinalities
+            return m * np.log(m / empty)
+        return raw
+
+    def merge(self, other: 'HyperLogLog'):
+        if self.precision != other.precision:
+            raise ValueError("Cannot merge HyperLogLog sketches of different precision")
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+
+class WindowSketch:
+    """Searches, bookings and unique searchers per route for one time window"""
+
+    def __init__(self):
+        self.searches = CountMinSketch()
+        self.bookings = CountMinSketch()
+        self.users: Dict[str, HyperLogLog] = {}
+
+    def merge(self, other: 'WindowSketch'):
+        self.searches.merge(other.searches)
+        self.bookings.merge(other.bookings)
+        for route, users in other.users.items():
+            self.users.setdefault(route, HyperLogLog()).merge(users)
+
+
+class ClickstreamSketches:
+    """Window sketches keyed by ISO week, e.g. '2026-W42'"""
+
+    def __init__(self):
+        self.windows: Dict[str, WindowSketch] = {}
+        self.events = 0
+
+    def add_events(self, events: pd.DataFrame):
+        """Add a chunk of events with ts, event, origin, destination and user_id columns"""
+        routes = events['origin'].astype(str) + ' → ' + events['destination'].astype(str)
+        iso = pd.to_datetime(events['ts']).dt.isocalendar()
+        windows = iso['year'].astype(str) + '-W' + iso['week'].astype(str).str.zfill(2)
+        user_hashes = hash_keys(events['user_id'].astype(str), _USER_HASH_KEY)
+        is_search = (events['event'] == 'search').to_numpy()
+
+        for window, rows in windows.groupby(windows, sort=False).indices.items():
+            sketch = self.windows.setdefault(window, WindowSketch())
+            for counter, selected in ((sketch.searches, is_search[rows]), (sketch.bookings, ~is_search[rows])):
+                counts = routes.iloc[rows[selected]].value_counts()
+                if len(counts):
+                    counter.add(counts.index.to_numpy(dtype=object), counts.to_numpy())
+
+            search_rows = rows[is_search[rows]]
+            for route, route_rows in routes.iloc[search_rows].groupby(routes.iloc[search_rows], sort=False).indices.items():
+                sketch.users.setdefault(route, HyperLogLog()).add_hashes(user_hashes[search_rows[route_rows]])
+
+        self.events += len(events)
+
+    def merge(self, other: 'ClickstreamSketches'):
+        for window, sketch in other.windows.items():
+            if window in self.windows:
+                self.windows[window].merge(sketch)
+            else:
+                self.windows[window] = sketch
+        self.events += other.events
+
+    def prune(self, weeks: int, now: Optional[datetime] = None):
+        """Drop every window before the last `weeks` full weeks; the current week is kept as it fills"""
+        oldest = complete_weeks(weeks, now)[0] if weeks else iso_week((now or datetime.now()).date())
+        for window in [window for window in self.windows if window < oldest]:
+            del self.windows[window]
+
+    def combined(self, windows: Optional[List[str]] = None) -> WindowSketch:
+        """Merge the given windows (default all) into one sketch"""
+        combined = WindowSketch()
+        for window in windows if windows is not None else self.windows:
+            combined.merge(self.windows[window])
+        return combined
+
+    def route_popularity(self, routes: List[str], weeks: int = 4, now: Optional[datetime] = None) -> Dict[str, Dict]:
+        """Average weekly searches and bookings, and unique searchers, over the last `weeks` full weeks.
+
+        The current, partial week is left out, and weeks without events
+        count as zero, so logs that stopped long ago don't read as current.
+        """
+        combined = self.combined([window for window in complete_weeks(weeks, now) if window in self.windows])
+        searches = combined.searches.estimate(routes) / max(weeks, 1)
+        bookings = combined.bookings.estimate(routes) / max(weeks, 1)
+        return {
+            route: {
+                'weekly_searches': int(round(searches[i])),
+                'bookings': int(round(bookings[i])),
+                'unique_searchers': int(round(combined.users[route].estimate())) if route in combined.users else 0
+            }
+            for i, route in enumerate(routes)
+        }
+
+
+def _event_chunks(path: str, start: int, chunksize: int):
+    """Yield (events, end offset) for complete lines from a byte offset; a partly written last line is left for later"""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        offset, lines = start, []
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            lines.append(line)
+            offset += len(line)
+            if len(lines) >= chunksize:
+                yield pd.read_json(io.BytesIO(b''.join(lines)), lines=True, convert_dates=False, dtype=False), offset
+                lines = []
+        if lines:
+            yield pd.read_json(io.BytesIO(b''.join(lines)), lines=True, convert_dates=False, dtype=False), offset
+
+
+def ingest_file(path: str, start: int = 0, chunksize: int = 100000) -> Tuple[ClickstreamSketches, int]:
+    """Stream one JSONL event log from a byte offset into sketches, returning them and the offset reached"""
+    sketches = ClickstreamSketches()
+    offset = start
+    for chunk, offset in _event_chunks(path, start, chunksize):
+        if len(chunk):
+            sketches.add_events(chunk)
+    return sketches, offset
+
+
+def ingest_files(paths: List[str], processes: int = 1,
+                 starts: Optional[List[int]] = None) -> List[Tuple[ClickstreamSketches, int]]:
+    """Ingest each file, in parallel worker processes when there are several"""
+    starts = starts or [0] * len(paths)
+    if processes > 1 and len(paths) > 1:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            return list(pool.map(ingest_file, paths, starts))
+    return [ingest_file(path, start) for path, start in zip(paths, starts)]
+
+
+# One rolling aggregate per (directory, weeks): the latest weeks' sketches and how far
+# each file has been read, so memory depends on the window and not on log volume
+_directories: Dict[Tuple[str, int], Dict] = {}
+_directories_lock = threading.RLock()
+
+
+def load_directory(directory: str, processes: int = 1, weeks: int = 4,
+                   now: Optional[datetime] = None) -> ClickstreamSketches:
+    """Rolling sketches of the latest weeks of *.jsonl logs in a directory, ingesting only new lines.
+
+    Logs are expected to be append-only. If a file shrinks it was rotated
+    or rewritten, so the aggregate is rebuilt from every file. Events of
+    deleted files stay counted until their weeks leave the window. The
+    returned sketches are shared and updated in place, so threads should
+    use measure_route_popularity instead.
+    """
+    with _directories_lock:
+        state = _directories.setdefault((directory, weeks), {'sketches': ClickstreamSketches(), 'offsets': {}})
+        sizes = {path: os.path.getsize(path) for path in sorted(glob.glob(os.path.join(directory, '*.jsonl')))}
+
+        if any(sizes.get(path, offset) < offset for path, offset in state['offsets'].items()):
+            state['sketches'], state['offsets'] = ClickstreamSketches(), {}
+        offsets = state['offsets']
+        for path in [path for path in offsets if path not in sizes]:
+            del offsets[path]
+
+        pending = [path for path, size in sizes.items() if size > offsets.get(path, 0)]
+        results = ingest_files(pending, processes, [offsets.get(path, 0) for path in pending])
+        for path, (sketches, offset) in zip(pending, results):
+            state['sketches'].merge(sketches)
+            offsets[path] = offset
+        state['sketches'].prune(weeks, now)
+        return state['sketches']
+
+
+def measure_route_popularity(directory: str, routes: List[str], processes: int = 1,
+                             weeks: int = 4, now: Optional[datetime] = None) -> Dict[str, Dict]:
+    """Route popularity over the last full weeks of a log directory, safe to call from several threads"""
+    with _directories_lock:
+        return load_directory(directory, processes, weeks, now).route_popularity(routes, weeks, now)
+
+
+class ClickstreamDataSource(DataSourceBackend):
+    """Wrap a backend, replacing its route popularity counts with ones measured from event logs"""
+
+    def __init__(self, backend: DataSourceBackend, directory: str, processes: int = 1, weeks: int = 4):
+        super().__init__()
+        self.backend = backend
+        self.directory = directory
+        self.processes = processes
+        self.weeks = weeks
+        self.australian_airports = backend.australian_airports
+
+    def scrape_flight_data(self, origin: str, destination: str, date: str) -> Dict:
+        return self.backend.scrape_flight_data(origin, destination, date)
+
+    def get_price_trends(self, days: int = 30) -> pd.DataFrame:
+        return self.backend.get_price_trends(days)
+
+    def get_route_popularity(self) -> Dict:
+        popularity_data = self.backend.get_route_popularity()
+        measured = measure_route_popularity(self.directory, list(popularity_data), self.processes, self.weeks)
+        for route, counts in measured.items():
+            data = popularity_data[route]
+            data.update(counts)
+            if 'conversion_rate' in data:
+                # A simulated rate would contradict the measured counts; routes without searches have none
+                data['conversion_rate'] = (round(counts['bookings'] / counts['weekly_searches'] * 100, 1)
+                                           if counts['weekly_searches'] else float('nan'))
+        return popularity_data
+
+
+def write_synthetic_logs(directory: str, events: int, files: int, users: int = 100000, weeks: int = 4) -> List[str]:
+    """Write random search/booking events, skewed towards a few busy routes, for benchmarking"""
+    cities = list(AUSTRALIAN_AIRPORTS.keys())
+    rng = np.random.default_rng(7)
+    start = datetime.now() - timedelta(weeks=weeks)
+    paths = []
+    for file_index in range(files):
+        count = events // files
+        origins = rng.zipf(1.6, count) % len(cities)
+        destinations = (origins + 1 + rng.zipf(1.6, count) % (len(cities) - 1)) % len(cities)
+        frame = pd.DataFrame({
+            'ts': (start + pd.to_timedelta(rng.integers(0, weeks * 7 * 86400, count), unit='s')).strftime('%Y-%m-%dT%H:%M:%S'),
+            'event': np.where(rng.random(count) < 0.2, 'booking', 'search'),
+            'origin': np.array(cities)[origins],
+            'destination': np.array(cities)[destinations],
+            'user_id': np.char.add('u-', rng.integers(0, users, count).astype(str))
+        })
+        path = os.path.join(directory, f'events_{file_index:03d}.jsonl')
+        frame.to_json(path, orient='records', lines=True)
+        paths.append(path)
+    return paths
+
+
+def benchmark(events: int, files: int, processes: int):
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"Writing {events:,} synthetic events across {files} files...")
+        paths = write_synthetic_logs(directory, events, files)
+        size_mb = sum(os.path.getsize(path) for path in paths) / 1024 / 1024
+
+        start = time.perf_counter()
+        sketches = ClickstreamSketches()
+        for file_sketches, _ in ingest_files(paths, processes):
+            sketches.merge(file_sketches)
+        elapsed = time.perf_counter() - start
+
+        exact = pd.concat(pd.read_json(path, lines=True, convert_dates=False) for path in paths)
+        exact['route'] = exact['origin'] + ' → ' + exact['destination']
+
+    combined = sketches.combined()
+    searches = exact[exact['event'] == 'search']
+    exact_counts = searches['route'].value_counts()
+    exact_users = searches.groupby('route')['user_id'].nunique()
+    estimated_counts = pd.Series(combined.searches.estimate(list(exact_counts.index)), index=exact_counts.index)
+    count_error = ((estimated_counts - exact_counts) / exact_counts).abs().max()
+    user_error = max(abs(combined.users[route].estimate() - users) / users for route, users in exact_users.items())
+
+    sketch_bytes = sum(
+        w.searches.table.nbytes + w.bookings.table.nbytes + sum(h.registers.nbytes for h in w.users.values())
+        for w in sketches.windows.values()
+    )
+    print(f"Ingested {sketches.events:,} events ({size_mb:.0f} MB) in {elapsed:.2f}s "
+          f"with {processes} process(es): {sketches.events / elapsed:,.0f} events/s")
+    print(f"Sketch memory: {sketch_bytes / 1024:.0f} KB for {len(sketches.windows)} weekly windows")
+    print(f"Max relative error: searches {count_error:.2%}, unique searchers {user_error:.2%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Route popularity from clickstream event logs")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    ingest = commands.add_parser('ingest', help="Print route popularity measured from a log directory")
+    ingest.add_argument('directory')
+    ingest.add_argument('--processes', type=int, default=os.cpu_count())
+    ingest.add_argument('--weeks', type=int, default=4, help="Full weeks before this one to average over")
+
+    bench = commands.add_parser('benchmark', help="Measure ingestion throughput on synthetic logs")
+    bench.add_argument('--events', type=int, default=1000000)
+    bench.add_argument('--files', type=int, default=4)
+    bench.add_argument('--processes', type=int, default=os.cpu_count())
+
+    args = parser.parse_args()
+    if args.command == 'benchmark':
+        benchmark(args.events, args.files, args.processes)
+    else:
+        routes = [f"{origin} → {destination}" for origin in AUSTRALIAN_AIRPORTS for destination in AUSTRALIAN_AIRPORTS if origin != destination]
+        popularity = pd.DataFrame(measure_route_popularity(args.directory, routes, args.processes, args.weeks)).T
+        print(popularity.sort_values('weekly_searches', ascending=False).to_string())
+
+
+if __name__ == '__main__':
+    main()
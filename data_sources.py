@@ -0,0 +1,300 @@
+import atexit
+import gzip
+import json
+import os
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from schema import AIRCRAFT, AIRLINES, AUSTRALIAN_AIRPORTS, build_trends_frame
+
+DEFAULT_CAPTURE_FILE = 'airline_capture.jsonl.gz'
+
+
+class DataSourceBackend(ABC):
+    """Interface shared by every source of flight, popularity and trend data"""
+
+    def __init__(self):
+        self.australian_airports = dict(AUSTRALIAN_AIRPORTS)
+
+    @abstractmethod
+    def scrape_flight_data(self, origin: str, destination: str, date: str) -> Dict:
+        """Return flights and price summary for one route on one date"""
+
+    @abstractmethod
+    def get_route_popularity(self) -> Dict:
+        """Return search, booking and trend figures keyed by route"""
+
+    @abstractmethod
+    def get_price_trends(self, days: int = 30) -> pd.DataFrame:
+        """Return daily prices per route for the last `days` days"""
+
+
+class SimulatedDataSource(DataSourceBackend):
+    """Random but realistic airline data, with a simulated network delay"""
+
+    def __init__(self, delay_range: Tuple[float, float] = (0.5, 1.5),
+                 flight_count_range: Tuple[int, int] = (3, 8),
+                 availability_options: Optional[List[str]] = None,
+                 include_conversion_rate: bool = False):
+        super().__init__()
+        self.delay_range = delay_range
+        self.flight_count_range = flight_count_range
+        self.availability_options = availability_options or ['Available', 'Limited', 'Sold Out']
+        self.include_conversion_rate = include_conversion_rate
+
+    def scrape_flight_data(self, origin: str, destination: str, date: str) -> Dict:
+        """Simulate real-time flight data scraping with realistic data"""
+        # Simulate API delay
+        time.sleep(random.uniform(*self.delay_range))
+
+        # Generate realistic flight data
+        base_price = random.randint(150, 800)
+
+        flights = []
+        for i in range(random.randint(*self.flight_count_range)):
+            airline = random.choice(AIRLINES)
+            price = base_price + random.randint(-50, 200)
+            departure_time = f"{random.randint(6, 22):02d}:{random.choice(['00', '15', '30', '45'])}"
+            duration = f"{random.randint(1, 8)}h {random.randint(0, 59)}m"
+
+            flights.append({
+                'airline': airline,
+                'price': price,
+                'departure_time': departure_time,
+                'duration': duration,
+                'aircraft': random.choice(AIRCRAFT),
+                'availability': random.choice(self.availability_options)
+            })
+
+        return {
+            'route': f"{origin} → {destination}",
+            'date': date,
+            'flights': flights,
+            'avg_price': np.mean([f['price'] for f in flights]),
+            'min_price': min([f['price'] for f in flights]),
+            'max_price': max([f['price'] for f in flights]),
+            'total_flights': len(flights),
+            'demand_level': random.choice(['High', 'Medium', 'Low']),
+            'peak_times': ['08:00-10:00', '17:00-19:00', '12:00-14:00']
+        }
+
+    def get_route_popularity(self) -> Dict:
+        """Generate route popularity data"""
+        routes = [
+            'Sydney → Melbourne', 'Melbourne → Sydney', 'Sydney → Brisbane',
+            'Brisbane → Sydney', 'Perth → Sydney', 'Sydney → Perth',
+            'Melbourne → Brisbane', 'Brisbane → Melbourne', 'Adelaide → Melbourne',
+            'Melbourne → Adelaide', 'Sydney → Gold Coast', 'Gold Coast → Sydney'
+        ]
+
+        popularity_data = {}
+        for route in routes:
+            popularity_data[route] = {
+                'weekly_searches': random.randint(5000, 50000),
+                'bookings': random.randint(1000, 10000),
+                'avg_price': random.randint(200, 600),
+                'demand_trend': random.choice(['Increasing', 'Stable', 'Decreasing']),
+                'peak_season': random.choice(['Summer', 'Winter', 'Year-round'])
+            }
+            if self.include_conversion_rate:
+                popularity_data[route]['conversion_rate'] = round(random.uniform(15, 35), 1)
+
+        return popularity_data
+
+    def get_price_trends(self, days: int = 30) -> pd.DataFrame:
+        """Generate price trend data"""
+        dates = pd.date_range(start=datetime.now() - timedelta(days=days), end=datetime.now(), freq='D')
+
+        trends_data = []
+        for date in dates:
+            for route in ['Sydney-Melbourne', 'Sydney-Brisbane', 'Melbourne-Brisbane', 'Sydney-Perth']:
+                base_price = {'Sydney-Melbourne': 300, 'Sydney-Brisbane': 350, 'Melbourne-Brisbane': 280, 'Sydney-Perth': 450}[route]
+
+                # Add seasonal and weekly variations
+                seasonal_factor = 1 + 0.2 * np.sin(2 * np.pi * date.dayofyear / 365)
+                weekly_factor = 1 + 0.1 * np.sin(2 * np.pi * date.weekday() / 7)
+                random_factor = 1 + random.uniform(-0.15, 0.15)
+
+                price = base_price * seasonal_factor * weekly_factor * random_factor
+
+                trends_data.append({
+                    'date': date,
+                    'route': route,
+                    'price': round(price, 2),
+                    'demand_score': random.randint(60, 100),
+                    'bookings': random.randint(100, 1000)
+                })
+
+        return build_trends_frame(trends_data)
+
+
+def _request_key(method: str, *args) -> str:
+    """Build the lookup key a captured response is stored under"""
+    return json.dumps([method, *args], separators=(',', ':'))
+
+
+def json_default(value):
+    """Serialize numpy scalars that json cannot handle natively"""
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _encode_response(method: str, response):
+    """Convert a backend response into JSON-serializable data"""
+    if method == 'get_price_trends':
+        frame = response.copy()
+        frame['date'] = frame['date'].dt.strftime('%Y-%m-%dT%H:%M:%S.%f')
+        return frame.to_dict('records')
+    return response
+
+
+def _decode_response(method: str, payload):
+    """Rebuild a backend response from its captured JSON form"""
+    if method == 'get_price_trends':
+        return build_trends_frame(payload)
+    return payload
+
+
+# One open gzip stream per capture file, shared by every recorder in the process. Appending
+# a new gzip member per response would compress each line on its own and bloat the file.
+_capture_writers: Dict[str, Dict] = {}
+_capture_lock = threading.Lock()
+CAPTURE_FLUSH_LINES = 100
+
+
+def _write_capture_line(path: str, line: str):
+    with _capture_lock:
+        writer = _capture_writers.get(path)
+        if writer is None:
+            writer = _capture_writers[path] = {'file': gzip.open(path, 'at', encoding='utf-8'), 'pending': 0}
+        writer['file'].write(line + '\n')
+        writer['pending'] += 1
+        # Sync periodically so a crash loses at most a batch of responses
+        if writer['pending'] >= CAPTURE_FLUSH_LINES:
+            writer['file'].flush()
+            writer['pending'] = 0
+
+
+@atexit.register
+def close_captures():
+    """Finish every open capture stream; called automatically at exit"""
+    with _capture_lock:
+        for writer in _capture_writers.values():
+            writer['file'].close()
+        _capture_writers.clear()
+
+
+class RecordingDataSource(DataSourceBackend):
+    """Pass calls through to another backend and append each response to a capture file"""
+
+    def __init__(self, backend: DataSourceBackend, path: str = DEFAULT_CAPTURE_FILE):
+        super().__init__()
+        self.backend = backend
+        self.path = path
+        self.australian_airports = backend.australian_airports
+
+    def _record(self, method: str, args: list, response):
+        line = json.dumps({
+            'key': _request_key(method, *args),
+            'method': method,
+            'response': _encode_response(method, response)
+        }, default=json_default, separators=(',', ':'))
+        _write_capture_line(self.path, line)
+        return response
+
+    def scrape_flight_data(self, origin: str, destination: str, date: str) -> Dict:
+        response = self.backend.scrape_flight_data(origin, destination, date)
+        return self._record('scrape_flight_data', [origin, destination, date], response)
+
+    def get_route_popularity(self) -> Dict:
+        return self._record('get_route_popularity', [], self.backend.get_route_popularity())
+
+    def get_price_trends(self, days: int = 30) -> pd.DataFrame:
+        return self._record('get_price_trends', [days], self.backend.get_price_trends(days))
+
+
+_replay_indexes: Dict[str, Tuple[float, Dict[str, str]]] = {}
+_replay_lock = threading.Lock()
+
+
+def load_replay_index(path: str) -> Dict[str, str]:
+    """Load a capture file into a key -> response JSON index, shared per file version"""
+    mtime = os.path.getmtime(path)
+    with _replay_lock:
+        cached = _replay_indexes.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+        index = {}
+        with gzip.open(path, 'rt', encoding='utf-8') as capture:
+            for line in capture:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                # Later captures of the same request replace earlier ones
+                index[entry['key']] = json.dumps(entry['response'], separators=(',', ':'))
+
+        _replay_indexes[path] = (mtime, index)
+        return index
+
+
+class ReplayDataSource(DataSourceBackend):
+    """Serve previously captured responses from memory, without delays or network"""
+
+    def __init__(self, path: str = DEFAULT_CAPTURE_FILE, fallback: Optional[DataSourceBackend] = None):
+        super().__init__()
+        self.path = path
+        self.fallback = fallback
+        self.index = load_replay_index(path)
+
+    def _replay(self, method: str, args: list):
+        payload = self.index.get(_request_key(method, *args))
+        if payload is None:
+            if self.fallback is None:
+                raise KeyError(f"No captured response for {method}{tuple(args)} in {self.path}")
+            return getattr(self.fallback, method)(*args)
+        return _decode_response(method, json.loads(payload))
+
+    def scrape_flight_data(self, origin: str, destination: str, date: str) -> Dict:
+        return self._replay('scrape_flight_data', [origin, destination, date])
+
+    def get_route_popularity(self) -> Dict:
+        return self._replay('get_route_popularity', [])
+
+    def get_price_trends(self, days: int = 30) -> pd.DataFrame:
+        return self._replay('get_price_trends', [days])
+
+
+def create_data_source(simulator: Optional[DataSourceBackend] = None) -> DataSourceBackend:
+    """Pick the backend named by AIRLINE_DATA_BACKEND (simulated, record or replay).
+
+    Route popularity is measured from event logs when AIRLINE_CLICKSTREAM_DIR is set.
+    """
+    simulator = simulator or SimulatedDataSource()
+    backend = os.environ.get('AIRLINE_DATA_BACKEND', 'simulated').lower()
+    data_file = os.environ.get('AIRLINE_DATA_FILE', DEFAULT_CAPTURE_FILE)
+
+    if backend == 'simulated':
+        source = simulator
+    elif backend == 'record':
+        source = RecordingDataSource(simulator, data_file)
+    elif backend == 'replay':
+        # Selections the capture doesn't cover are simulated rather than failing the page
+        source = ReplayDataSource(data_file, fallback=simulator)
+    else:
+        raise ValueError(f"Unknown AIRLINE_DATA_BACKEND '{backend}'")
+
+    clickstream_dir = os.environ.get('AIRLINE_CLICKSTREAM_DIR')
+    if clickstream_dir:
+        # Imported here because clickstream builds on this module
+        from clickstream import ClickstreamDataSource
+        source = ClickstreamDataSource(source, clickstream_dir)
+    return source
@@ -0,0 +1,166 @@
+import threading
+from datetime import date, datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import streamlit as st
+
+from data_sources import DataSourceBackend
+from figure_cache import get_figure_cache
+from route_cache import RouteCache, get_route_data
+
+
+class FareSegmentTree:
+    """Segment tree of the cheapest fare per travel date over a contiguous date range"""
+
+    def __init__(self, start_date: date, days: int = 64):
+        self.start_date = start_date
+        self.size = 1
+        while self.size < days:
+            self.size *= 2
+        # Leaves live at [size, 2 * size); unknown dates hold infinity
+        self.prices = np.full(2 * self.size, np.inf)
+        self.offsets = np.full(2 * self.size, -1, dtype=np.int64)
+
+    @property
+    def end_date(self) -> date:
+        return self.start_date + timedelta(days=self.size - 1)
+
+    def _better(self, a: int, b: int) -> int:
+        """Node holding the lower fare; ties go to the earlier date"""
+        if self.prices[a] < self.prices[b]:
+            return a
+        if self.prices[b] < self.prices[a]:
+            return b
+        return a if self.offsets[a] <= self.offsets[b] else b
+
+    def _pull(self, node: int):
+        best = self._better(2 * node, 2 * node + 1)
+        self.prices[node] = self.prices[best]
+        self.offsets[node] = self.offsets[best]
+
+    def update(self, travel_date: date, price: float):
+        """Set the cheapest fare for one date in O(log n)"""
+        offset = (travel_date - self.start_date).days
+        node = offset + self.size
+        self.prices[node] = price
+        self.offsets[node] = offset
+        node //= 2
+        while node:
+            self._pull(node)
+            node //= 2
+
+    def query(self, start: date, end: date) -> Optional[Tuple[date, float]]:
+        """Cheapest (date, fare) between two dates inclusive in O(log n), or None if nothing is known"""
+        low = max((start - self.start_date).days, 0) + self.size
+        high = min((end - self.start_date).days, self.size - 1) + self.size + 1
+        best = None
+        while low < high:
+            if low & 1:
+                best = low if best is None else self._better(best, low)
+                low += 1
+            if high & 1:
+                high -= 1
+                best = high if best is None else self._better(best, high)
+            low //= 2
+            high //= 2
+        if best is None or self.offsets[best] < 0:
+            return None
+        return self.start_date + timedelta(days=int(self.offsets[best])), float(self.prices[best])
+
+    def fares(self, start: date, end: date) -> np.ndarray:
+        """Per-date fares between two dates inclusive, infinity where unknown"""
+        fares = np.full((end - start).days + 1, np.inf)
+        low = max((start - self.start_date).days, 0)
+        high = min((end - self.start_date).days, self.size - 1)
+        if low <= high:
+            shift = (self.start_date - start).days
+            fares[low + shift:high + shift + 1] = self.prices[self.size + low:self.size + high + 1]
+        return fares
+
+
+class FareIndex:
+    """Per-route fare segment trees, updated incrementally as route data is fetched"""
+
+    def __init__(self):
+        self.trees: Dict[str, FareSegmentTree] = {}
+        self._lock = threading.Lock()
+
+    def _tree_for(self, route: str, travel_date: date) -> FareSegmentTree:
+        tree = self.trees.get(route)
+        if tree is None:
+            tree = self.trees[route] = FareSegmentTree(travel_date)
+        elif not tree.start_date <= travel_date <= tree.end_date:
+            # Grow to cover the new date, copying known fares into a larger tree
+            known = np.flatnonzero(np.isfinite(tree.prices[tree.size:]))
+            start = min(tree.start_date, travel_date)
+            end = max(tree.start_date + timedelta(days=int(known[-1])), travel_date)
+            grown = FareSegmentTree(start, 2 * ((end - start).days + 1))
+            for offset in known:
+                grown.update(tree.start_date + timedelta(days=int(offset)), tree.prices[tree.size + offset])
+            tree = self.trees[route] = grown
+        return tree
+
+    def add(self, route_data: Dict):
+        """Record the cheapest fare from a scrape_flight_data result"""
+        travel_date = datetime.strptime(route_data['date'], "%Y-%m-%d").date()
+        with self._lock:
+            self._tree_for(route_data['route'], travel_date).update(travel_date, route_data['min_price'])
+
+    def cheapest(self, route: str, start: date, end: date) -> Optional[Tuple[date, float]]:
+        """Cheapest known (date, fare) for a route within a date range"""
+        with self._lock:
+            tree = self.trees.get(route)
+            return tree.query(start, end) if tree else None
+
+    def calendar(self, route: str, start: date, end: date) -> pd.DataFrame:
+        """Known cheapest fare for every date in a range, NaN where not yet fetched"""
+        with self._lock:
+            tree = self.trees.get(route)
+            fares = tree.fares(start, end) if tree else np.full((end - start).days + 1, np.inf)
+        return pd.DataFrame({
+            'date': pd.date_range(start, end, freq='D'),
+            'min_price': np.where(np.isfinite(fares), fares, np.nan)
+        })
+
+
+@st.cache_resource
+def get_fare_index() -> FareIndex:
+    """Fare index shared by every session on this server"""
+    return FareIndex()
+
+
+def render_fare_calendar(fare_index: FareIndex, data_source: DataSourceBackend, route_cache: RouteCache,
+                         origin: str, destination: str, start_date: date):
+    """Fare calendar with the cheapest known day to fly over the coming days"""
+    route = f"{origin} → {destination}"
+    horizon = st.slider("Calendar Horizon (days):", 7, 90, 60)
+    end_date = start_date + timedelta(days=horizon - 1)
+
+    # Dates already warmed by the refresh worker
+    for route_data in route_cache.get_range(origin, destination, start_date, end_date):
+        fare_index.add(route_data)
+
+    calendar_df = fare_index.calendar(route, start_date, end_date)
+    missing_dates = calendar_df.loc[calendar_df['min_price'].isna(), 'date']
+
+    if len(missing_dates) and st.button(f"📥 Fetch {len(missing_dates)} missing dates"):
+        progress = st.progress(0.0)
+        for i, missing_date in enumerate(missing_dates):
+            fare_index.add(get_route_data(data_source, route_cache, origin, destination, missing_date.strftime("%Y-%m-%d")))
+            progress.progress((i + 1) / len(missing_dates))
+        calendar_df = fare_index.calendar(route, start_date, end_date)
+
+    cheapest = fare_index.cheapest(route, start_date, end_date)
+    if cheapest:
+        cheapest_date, cheapest_price = cheapest
+        st.metric("Cheapest Known Day", cheapest_date.strftime("%a %d %b %Y"), f"${cheapest_price:.0f}", delta_color="off")
+
+    fig_calendar = get_figure_cache().get(
+        f'fare_calendar:{route}', calendar_df,
+        lambda df: px.bar(df, x='date', y='min_price', title=f"Cheapest Fare by Date: {route}",
+                          labels={'date': 'Travel Date', 'min_price': 'Cheapest Fare ($)'})
+    )
+    st.plotly_chart(fig_calendar, use_container_width=True)
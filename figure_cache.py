@@ -0,0 +1,80 @@
+from typing import Callable, Dict, Optional
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import streamlit as st
+
+
+def row_hashes(data: pd.DataFrame) -> np.ndarray:
+    """One 64-bit hash per row, used to tell unchanged, appended and changed data apart"""
+    return pd.util.hash_pandas_object(data, index=False).to_numpy()
+
+
+def extend_traces(fig: go.Figure, rows: pd.DataFrame, x: str, y: Optional[str] = None,
+                  color: Optional[str] = None) -> bool:
+    """Append new rows to the matching traces of a Plotly Express figure.
+
+    Returns False when a row belongs to a trace the figure doesn't have yet,
+    in which case the caller should rebuild the figure instead.
+    """
+    if color:
+        traces = {trace.name: trace for trace in fig.data}
+        groups = [(str(name), group) for name, group in rows.groupby(color, observed=True, sort=False)]
+        if any(name not in traces for name, _ in groups):
+            return False
+        updates = [(traces[name], group) for name, group in groups]
+    else:
+        if len(fig.data) != 1:
+            return False
+        updates = [(fig.data[0], rows)]
+
+    for trace, group in updates:
+        trace.x = tuple(trace.x) + tuple(group[x])
+        if y is not None:
+            trace.y = tuple(trace.y) + tuple(group[y])
+    return True
+
+
+class FigureCache:
+    """Figures kept between reruns, rebuilt only when their data changes and patched when it grows"""
+
+    def __init__(self):
+        self.entries: Dict[str, Dict] = {}
+        self.stats = {'reused': 0, 'patched': 0, 'rebuilt': 0}
+
+    def get(self, key: str, data: pd.DataFrame, build: Callable[[pd.DataFrame], go.Figure],
+            append: Optional[Callable[[go.Figure, pd.DataFrame], bool]] = None) -> go.Figure:
+        """Cached figure for `data`, calling `build` or `append` only for what changed"""
+        hashes = row_hashes(data)
+        entry = self.entries.get(key)
+
+        if entry is not None:
+            previous = entry['hashes']
+            if np.array_equal(hashes, previous):
+                self.stats['reused'] += 1
+                return entry['fig']
+
+            grew = len(hashes) > len(previous) and np.array_equal(hashes[:len(previous)], previous)
+            if grew and append is not None and append(entry['fig'], data.iloc[len(previous):]):
+                entry['hashes'] = hashes
+                self.stats['patched'] += 1
+                return entry['fig']
+
+        fig = build(data)
+        self.entries[key] = {'fig': fig, 'hashes': hashes}
+        self.stats['rebuilt'] += 1
+        return fig
+
+    @property
+    def reuse_rate(self) -> float:
+        """Share of figure requests served without a full rebuild"""
+        total = sum(self.stats.values())
+        return (self.stats['reused'] + self.stats['patched']) / total if total else 0.0
+
+
+def get_figure_cache() -> FigureCache:
+    """Figure cache for the current session; figures are patched in place, so sessions don't share them"""
+    if 'figure_cache' not in st.session_state:
+        st.session_state['figure_cache'] = FigureCache()
+    return st.session_state['figure_cache']
@@ -0,0 +1,165 @@
+import math
+from datetime import time, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from schema import build_flights_frame
+
+SORT_OPTIONS = {
+    'Price': 'price',
+    'Departure Time': 'departure',
+    'Airline': 'airline'
+}
+
+
+class FlightTable:
+    """Flights pre-sorted and indexed by price, departure and airline for server-side paging"""
+
+    def __init__(self, flights: List[Dict]):
+        self.frame = build_flights_frame(flights)
+
+        prices = self.frame['price'].to_numpy(dtype=float)
+        departures = self._departure_minutes(self.frame['departure_time'])
+        # Categorical columns factorize in declaration order, so sort on the names themselves
+        airline_codes, self.airlines = pd.factorize(self.frame['airline'].astype(str), sort=True)
+        self.airlines = list(self.airlines)
+
+        # Stable sort orders; ties keep the order the flights were fetched in
+        self._orders = {
+            'price': np.argsort(prices, kind='stable'),
+            'departure': np.argsort(departures, kind='stable'),
+            'airline': np.lexsort((prices, airline_codes))
+        }
+        self._sorted_prices = prices[self._orders['price']]
+        self._sorted_departures = departures[self._orders['departure']]
+
+        # Row positions per airline and availability value
+        self._airline_rows = {airline: np.flatnonzero(airline_codes == code) for code, airline in enumerate(self.airlines)}
+        self.availability = list(self.frame['availability'].cat.remove_unused_categories().cat.categories)
+        self._availability_rows = {
+            value: np.flatnonzero(self.frame['availability'].to_numpy() == value) for value in self.availability
+        }
+
+    @staticmethod
+    def _departure_minutes(times: pd.Series) -> np.ndarray:
+        """Convert HH:MM departure times to minutes after midnight"""
+        parts = times.astype(str).str.split(':', n=1, expand=True)
+        if parts.empty:
+            return np.array([], dtype=float)
+        return (parts[0].astype(int) * 60 + parts[1].astype(int)).to_numpy(dtype=float)
+
+    @property
+    def price_bounds(self) -> Tuple[int, int]:
+        if not len(self._sorted_prices):
+            return 0, 0
+        return int(self._sorted_prices[0]), int(math.ceil(self._sorted_prices[-1]))
+
+    @property
+    def departure_bounds(self) -> Tuple[int, int]:
+        """Earliest and latest departure, in minutes after midnight"""
+        if not len(self._sorted_departures):
+            return 0, 0
+        return int(self._sorted_departures[0]), int(self._sorted_departures[-1])
+
+    def _range_rows(self, sort_key: str, sorted_values: np.ndarray, low: float, high: float) -> np.ndarray:
+        """Rows whose value lies in [low, high], found by binary search on a sorted index"""
+        start = np.searchsorted(sorted_values, low, side='left')
+        stop = np.searchsorted(sorted_values, high, side='right')
+        return self._orders[sort_key][start:stop]
+
+    def query(self, airlines: Optional[Sequence[str]] = None,
+              price_range: Optional[Tuple[float, float]] = None,
+              departure_range: Optional[Tuple[int, int]] = None,
+              availability: Optional[Sequence[str]] = None,
+              sort_by: str = 'price', ascending: bool = True) -> np.ndarray:
+        """Return row positions matching every filter, in the requested sort order"""
+        mask = np.ones(len(self.frame), dtype=bool)
+
+        if price_range is not None:
+            selected = np.zeros_like(mask)
+            selected[self._range_rows('price', self._sorted_prices, *price_range)] = True
+            mask &= selected
+
+        if departure_range is not None:
+            selected = np.zeros_like(mask)
+            selected[self._range_rows('departure', self._sorted_departures, *departure_range)] = True
+            mask &= selected
+
+        for index, values in ((self._airline_rows, airlines), (self._availability_rows, availability)):
+            if values is None:
+                continue
+            selected = np.zeros_like(mask)
+            for value in values:
+                selected[index.get(value, [])] = True
+            mask &= selected
+
+        order = self._orders[sort_by]
+        if not ascending:
+            order = order[::-1]
+        return order[mask[order]]
+
+    def page(self, rows: np.ndarray, page_number: int, page_size: int) -> pd.DataFrame:
+        """Slice one page out of the matching rows; page numbers start at 1"""
+        start = (page_number - 1) * page_size
+        return self.frame.iloc[rows[start:start + page_size]].reset_index(drop=True)
+
+
+def get_flight_table(route_data: Dict) -> FlightTable:
+    """Flight table for the selected route and date, kept across reruns until the selection or its flights change"""
+    key = (route_data['route'], route_data['date'])
+    entry = st.session_state.get('flight_table')
+    if entry is None or entry['key'] != key or entry['flights'] != route_data['flights']:
+        entry = {'key': key, 'flights': route_data['flights'], 'table': FlightTable(route_data['flights'])}
+        st.session_state['flight_table'] = entry
+    return entry['table']
+
+
+def _minutes_to_time(minutes: int) -> time:
+    return time(minutes // 60, minutes % 60)
+
+
+def render_flight_table(flight_table: FlightTable, page_size: int = 20):
+    """Filter, sort and page the flights server-side, sending only the visible page"""
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        selected_airlines = st.multiselect("Airlines:", flight_table.airlines, default=flight_table.airlines)
+
+    with col2:
+        min_price, max_price = flight_table.price_bounds
+        price_range = None
+        if min_price < max_price:
+            price_range = st.slider("Price Range ($):", min_price, max_price, (min_price, max_price))
+
+    with col3:
+        sort_label = st.selectbox("Sort By:", list(SORT_OPTIONS.keys()))
+        ascending = st.checkbox("Ascending", value=True)
+
+    col4, col5 = st.columns(2)
+
+    with col4:
+        earliest, latest = flight_table.departure_bounds
+        departure_range = None
+        if earliest < latest:
+            start, end = st.slider("Departure Time:", _minutes_to_time(earliest), _minutes_to_time(latest),
+                                   (_minutes_to_time(earliest), _minutes_to_time(latest)),
+                                   step=timedelta(minutes=15), format="HH:mm")
+            departure_range = (start.hour * 60 + start.minute, end.hour * 60 + end.minute)
+
+    with col5:
+        selected_availability = st.multiselect("Availability:", flight_table.availability, default=flight_table.availability)
+
+    rows = flight_table.query(airlines=selected_airlines, price_range=price_range,
+                              departure_range=departure_range, availability=selected_availability,
+                              sort_by=SORT_OPTIONS[sort_label], ascending=ascending)
+
+    total_pages = max(1, math.ceil(len(rows) / page_size))
+    page_number = 1
+    if total_pages > 1:
+        page_number = st.number_input("Page:", min_value=1, max_value=total_pages, value=1)
+
+    st.dataframe(flight_table.page(rows, page_number, page_size), use_container_width=True)
+    st.caption(f"Showing page {page_number} of {total_pages} • {len(rows)} of {len(flight_table.frame)} flights match")
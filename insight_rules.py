@@ -0,0 +1,93 @@
+import re
+from string import Formatter
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+# Each rule is evaluated over every route at once:
+#   when      - boolean DataFrame.eval expression; omit to match every row
+#   rank_by   - column used to rank matching rows (highest first unless ascending)
+#   top       - keep only the best `top` ranked matches
+#   template  - str.format-style message built from row columns
+ROUTE_INSIGHT_RULES = [
+    {'name': 'high_demand', 'when': "demand_level == 'High'",
+     'template': "🔥 **High Demand Alert**: {route} shows strong booking activity"},
+    {'name': 'premium_pricing', 'when': "demand_level == 'High'",
+     'template': "💰 **Pricing Opportunity**: Average price ${avg_price:.0f} indicates premium market"},
+    {'name': 'stable_market', 'when': "demand_level == 'Medium'",
+     'template': "📊 **Stable Market**: {route} has moderate demand patterns"},
+    {'name': 'balanced_pricing', 'when': "demand_level == 'Medium'",
+     'template': "⚖️ **Balanced Pricing**: Price range ${min_price:.0f}-${max_price:.0f} shows competitive market"},
+    {'name': 'lower_demand', 'when': "demand_level not in ['High', 'Medium']",
+     'template': "📉 **Lower Demand**: {route} may have capacity for promotional pricing"},
+    {'name': 'marketing_target', 'when': "demand_level not in ['High', 'Medium']",
+     'template': "🎯 **Opportunity**: Consider targeting this route for hostel marketing"},
+    {'name': 'availability',
+     'template': "✈️ **Flight Availability**: {total_flights} flights available"},
+    {'name': 'peak_times',
+     'template': "⏰ **Peak Times**: Best booking windows are {peak_times}"}
+]
+
+OPPORTUNITY_RULES = [
+    {'name': 'high_value', 'when': "weekly_searches > 20000 and avg_price > 400", 'rank_by': 'weekly_searches',
+     'template': "{route}: {weekly_searches:,} weekly searches at ${avg_price:.0f}"}
+]
+
+_FIXED_POINT = re.compile(r'^\.(\d+)f$')
+
+
+def render_template(frame: pd.DataFrame, template: str) -> pd.Series:
+    """Fill a str.format-style template for every row using column-wise string operations"""
+    messages = pd.Series('', index=frame.index, dtype=object)
+    for literal, field, spec, _ in Formatter().parse(template):
+        messages = messages + literal
+        if field is None:
+            continue
+        values = frame[field]
+        fixed_point = _FIXED_POINT.match(spec or '')
+        if fixed_point:
+            text = np.char.mod(f'%.{fixed_point.group(1)}f', values.to_numpy(dtype=float))
+        elif spec:
+            text = values.map(f'{{:{spec}}}'.format)
+        else:
+            text = values.astype(str)
+        messages = messages + pd.Series(text, index=frame.index, dtype=object)
+    return messages
+
+
+def evaluate_rules(frame: pd.DataFrame, rules: List[Dict]) -> pd.DataFrame:
+    """Evaluate every rule against every row, returning one row per match in rule order.
+
+    The result has the matched row's index label, the rule name, its rank
+    among the rule's matches and the rendered message, if any.
+    """
+    results = []
+    # Rule sets often share conditions, so each distinct expression is evaluated once
+    masks = {None: np.ones(len(frame), dtype=bool)}
+    for order, rule in enumerate(rules):
+        condition = rule.get('when')
+        if condition not in masks:
+            masks[condition] = frame.eval(condition).to_numpy(dtype=bool)
+        matched = frame[masks[condition]]
+
+        if rule.get('rank_by'):
+            rank = matched[rule['rank_by']].rank(ascending=rule.get('ascending', False), method='first')
+            if rule.get('top'):
+                keep = (rank <= rule['top']).to_numpy()
+                matched, rank = matched[keep], rank[keep]
+        else:
+            rank = pd.Series(np.arange(1, len(matched) + 1), index=matched.index)
+
+        results.append(pd.DataFrame({
+            'row': matched.index,
+            'rule': rule['name'],
+            'rule_order': order,
+            'rank': rank.to_numpy(dtype=int),
+            'message': render_template(matched, rule['template']).to_numpy() if rule.get('template') else None
+        }))
+
+    if not results:
+        return pd.DataFrame(columns=['row', 'rule', 'rule_order', 'rank', 'message'])
+    return pd.concat(results, ignore_index=True).sort_values(['rule_order', 'rank'], kind='stable', ignore_index=True)
+
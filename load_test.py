@@ -0,0 +1,196 @@
+"""Concurrent-session load test for the Streamlit dashboards.
+
+Drives N headless sessions of an app, each in its own process, through
+every analysis type with Streamlit's AppTest API and reports render latency percentiles, throughput
+and per-session memory at each concurrency level. Sessions read from a
+replay capture, so results are deterministic and free of simulated delays.
+Because each session has its own process, the results describe independent
+runtimes, not one server process whose sessions share a GIL and caches.
+
+    python load_test.py --app streamlit_app.py --concurrency 1,2,4,8
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List
+
+import numpy as np
+from streamlit.testing.v1 import AppTest
+
+from data_sources import close_captures
+
+
+def _rss_mb() -> float:
+    """Current resident memory of this process in MB"""
+    try:
+        with open('/proc/self/statm') as statm:
+            pages = int(statm.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+    except (OSError, ValueError):
+        # Peak rather than current RSS, but the best portable fallback
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _analysis_selector(at: AppTest):
+    """The sidebar selectbox that switches between analysis pages"""
+    for selectbox in at.sidebar.selectbox:
+        if selectbox.label == "Select Analysis Type:":
+            return selectbox
+    raise RuntimeError("Analysis type selector not found in the sidebar")
+
+
+def run_session(app: str, pages: List[str], iterations: int, timeout: float, start_barrier=None) -> Dict:
+    """Render every page `iterations` times in one session and return latencies in seconds"""
+    latencies = {page: [] for page in pages}
+    errors = {page: 0 for page in pages}
+
+    at = AppTest.from_file(app, default_timeout=timeout)
+    try:
+        at.run()
+    except Exception:
+        # Release the other sessions rather than leaving them waiting for this one
+        if start_barrier is not None:
+            start_barrier.abort()
+        raise
+    rss_before = _rss_mb()
+    if start_barrier is not None:
+        # Start timing only once every session has finished importing and its first render;
+        # the timeout covers a slow spawn plus that render
+        start_barrier.wait(timeout=2 * timeout)
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for page in pages:
+            render_start = time.perf_counter()
+            try:
+                _analysis_selector(at).set_value(page).run()
+                failed = bool(at.exception)
+            except RuntimeError:
+                # AppTest raises when a render exceeds its timeout
+                failed = True
+            latencies[page].append(time.perf_counter() - render_start)
+            errors[page] += failed
+
+    return {
+        'latencies': latencies,
+        'errors': errors,
+        'elapsed': time.perf_counter() - start,
+        'rss_before_mb': rss_before,
+        'memory_growth_mb': _rss_mb() - rss_before
+    }
+
+
+def _check_render(at: AppTest, app: str, page: str):
+    if at.exception:
+        raise RuntimeError(f"{app} failed on {page} while recording: {at.exception[0].message}")
+
+
+def record_capture(app: str, capture_file: str, route_cache: str, timeout: float) -> List[str]:
+    """Record one pass over every page so sessions can replay it, and return the page names"""
+    if os.path.exists(capture_file):
+        os.remove(capture_file)
+    os.environ['AIRLINE_DATA_BACKEND'] = 'record'
+    os.environ['AIRLINE_DATA_FILE'] = capture_file
+    # An empty route cache, so Route Analysis really fetches and gets recorded
+    os.environ['AIRLINE_ROUTE_CACHE'] = route_cache
+
+    at = AppTest.from_file(app, default_timeout=timeout)
+    at.run()
+    _check_render(at, app, 'first render')
+    pages = list(_analysis_selector(at).options)
+    for page in pages:
+        _analysis_selector(at).set_value(page).run()
+        _check_render(at, app, page)
+    close_captures()
+    return pages
+
+
+def run_level(app: str, pages: List[str], sessions: int, iterations: int, timeout: float) -> Dict:
+    """Run `sessions` concurrent sessions and aggregate their latencies.
+
+    Each session runs in its own process: AppTest keeps a process-wide
+    runtime, so sessions sharing a process interfere with each other.
+    """
+    context = multiprocessing.get_context('spawn')
+    with context.Manager() as manager, ProcessPoolExecutor(max_workers=sessions, mp_context=context) as pool:
+        start_barrier = manager.Barrier(sessions)
+        futures = [pool.submit(run_session, app, pages, iterations, timeout, start_barrier) for _ in range(sessions)]
+        results = [future.result() for future in futures]
+
+    per_page = {}
+    for page in pages:
+        samples = np.array([s for r in results for s in r['latencies'][page]]) * 1000
+        per_page[page] = {
+            'renders': len(samples),
+            'errors': sum(r['errors'][page] for r in results),
+            'p50': np.percentile(samples, 50),
+            'p95': np.percentile(samples, 95),
+            'p99': np.percentile(samples, 99)
+        }
+
+    renders = sum(p['renders'] for p in per_page.values())
+    return {
+        'sessions': sessions,
+        'pages': per_page,
+        'throughput': renders / max(r['elapsed'] for r in results),
+        # Per session: summing processes would mostly count Python interpreters
+        'baseline_mb': np.mean([r['rss_before_mb'] for r in results]),
+        'memory_growth_mb': np.mean([r['memory_growth_mb'] for r in results])
+    }
+
+
+def print_report(app: str, levels: List[Dict]):
+    print(f"\nLoad test: {app}")
+    print("Each session runs in its own process, so this measures independent runtimes competing for the "
+          "machine, not one server process sharing its GIL and caches between sessions. Memory is per session.")
+    for level in levels:
+        print(f"\n{level['sessions']} concurrent session(s): "
+              f"{level['throughput']:.1f} renders/s, "
+              f"memory {level['baseline_mb']:.0f} MB per session after the first render "
+              f"({level['memory_growth_mb']:+.1f} MB each during the run)")
+        print(f"  {'Page':<22}{'renders':>8}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for page, stats in level['pages'].items():
+            print(f"  {page:<22}{stats['renders']:>8}{stats['errors']:>8}"
+                  f"{stats['p50']:>10.1f}{stats['p95']:>10.1f}{stats['p99']:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the airline dashboards with concurrent headless sessions")
+    parser.add_argument('--app', action='append', help="App script to test (repeatable, default: both apps)")
+    parser.add_argument('--concurrency', default='1,2,4,8', help="Comma-separated session counts")
+    parser.add_argument('--iterations', type=int, default=3, help="Passes over every page per session")
+    parser.add_argument('--capture-dir', default='.', help="Where per-app replay captures are recorded")
+    parser.add_argument('--timeout', type=float, default=60, help="Seconds allowed per render")
+    args = parser.parse_args()
+
+    apps = args.app or ['streamlit_app.py', 'main.py']
+    concurrency = [int(level) for level in args.concurrency.split(',')]
+
+    for app in apps:
+        # Each app simulates slightly different data, so each gets its own capture
+        stem = os.path.splitext(os.path.basename(app))[0]
+        capture_file = os.path.join(args.capture_dir, f'load_test_{stem}.jsonl.gz')
+
+        # Route caches live in a scratch directory, never the dashboard's shared one,
+        # and every level starts cold so Route Analysis is served from the capture
+        with tempfile.TemporaryDirectory(prefix='load_test_') as scratch:
+            # AppTest runs the app as __main__, so keep it out of this process
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+                pages = pool.submit(record_capture, app, capture_file,
+                                    os.path.join(scratch, 'record.sqlite3'), args.timeout).result()
+            os.environ['AIRLINE_DATA_BACKEND'] = 'replay'
+            os.environ['AIRLINE_DATA_FILE'] = capture_file
+
+            levels = []
+            for sessions in concurrency:
+                os.environ['AIRLINE_ROUTE_CACHE'] = os.path.join(scratch, f'sessions_{sessions}.sqlite3')
+                levels.append(run_level(app, pages, sessions, args.iterations, args.timeout))
+        print_report(app, levels)
+
+
+if __name__ == '__main__':
+    main()
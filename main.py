@@ -1,6 +1,5 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
 import requests
 from bs4 import BeautifulSoup
 import plotly.express as px
@@ -8,10 +7,16 @@ import plotly.graph_objects as go
 from datetime import datetime, timedelta
 import time
 import json
-import random
 from typing import Dict, List, Tuple
 import google.generativeai as genai
 from urllib.parse import urlencode
+from data_sources import SimulatedDataSource, create_data_source
+from flights_table import get_flight_table, render_flight_table
+from schema import build_popularity_frame, drop_unused_categories
+from figure_cache import extend_traces, get_figure_cache
+from fare_index import get_fare_index, render_fare_calendar
+from route_cache import get_route_cache, get_route_data
+from prefetch import get_prefetcher
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -78,100 +83,9 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-class AirlineDataScraper:
+class AirlineDataScraper(SimulatedDataSource):
     def __init__(self):
-        self.headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        self.australian_airports = {
-            'Sydney': 'SYD', 'Melbourne': 'MEL', 'Brisbane': 'BNE', 'Perth': 'PER',
-            'Adelaide': 'ADL', 'Gold Coast': 'OOL', 'Cairns': 'CNS', 'Darwin': 'DRW',
-            'Hobart': 'HBA', 'Canberra': 'CBR'
-        }
-        
-    def scrape_flight_data(self, origin: str, destination: str, date: str) -> Dict:
-        """Simulate real-time flight data scraping with realistic data"""
-        # Simulate API delay
-        time.sleep(random.uniform(0.5, 1.5))
-        
-        # Generate realistic flight data
-        airlines = ['Qantas', 'Jetstar', 'Virgin Australia', 'Tigerair', 'Rex Airlines']
-        base_price = random.randint(150, 800)
-        
-        flights = []
-        for i in range(random.randint(3, 8)):
-            airline = random.choice(airlines)
-            price = base_price + random.randint(-50, 200)
-            departure_time = f"{random.randint(6, 22):02d}:{random.choice(['00', '15', '30', '45'])}"
-            duration = f"{random.randint(1, 8)}h {random.randint(0, 59)}m"
-            
-            flights.append({
-                'airline': airline,
-                'price': price,
-                'departure_time': departure_time,
-                'duration': duration,
-                'aircraft': random.choice(['Boeing 737', 'Airbus A320', 'Boeing 787', 'Airbus A330']),
-                'availability': random.choice(['Available', 'Limited', 'Sold Out'])
-            })
-        
-        return {
-            'route': f"{origin} → {destination}",
-            'date': date,
-            'flights': flights,
-            'avg_price': np.mean([f['price'] for f in flights]),
-            'min_price': min([f['price'] for f in flights]),
-            'max_price': max([f['price'] for f in flights]),
-            'total_flights': len(flights),
-            'demand_level': random.choice(['High', 'Medium', 'Low']),
-            'peak_times': ['08:00-10:00', '17:00-19:00', '12:00-14:00']
-        }
-    
-    def get_route_popularity(self) -> Dict:
-        """Generate route popularity data"""
-        routes = [
-            'Sydney → Melbourne', 'Melbourne → Sydney', 'Sydney → Brisbane',
-            'Brisbane → Sydney', 'Perth → Sydney', 'Sydney → Perth',
-            'Melbourne → Brisbane', 'Brisbane → Melbourne', 'Adelaide → Melbourne',
-            'Melbourne → Adelaide', 'Sydney → Gold Coast', 'Gold Coast → Sydney'
-        ]
-        
-        popularity_data = {}
-        for route in routes:
-            popularity_data[route] = {
-                'weekly_searches': random.randint(5000, 50000),
-                'bookings': random.randint(1000, 10000),
-                'avg_price': random.randint(200, 600),
-                'demand_trend': random.choice(['Increasing', 'Stable', 'Decreasing']),
-                'peak_season': random.choice(['Summer', 'Winter', 'Year-round'])
-            }
-        
-        return popularity_data
-    
-    def get_price_trends(self, days: int = 30) -> pd.DataFrame:
-        """Generate price trend data"""
-        dates = pd.date_range(start=datetime.now() - timedelta(days=days), end=datetime.now(), freq='D')
-        
-        trends_data = []
-        for date in dates:
-            for route in ['Sydney-Melbourne', 'Sydney-Brisbane', 'Melbourne-Brisbane', 'Sydney-Perth']:
-                base_price = {'Sydney-Melbourne': 300, 'Sydney-Brisbane': 350, 'Melbourne-Brisbane': 280, 'Sydney-Perth': 450}[route]
-                
-                # Add seasonal and weekly variations
-                seasonal_factor = 1 + 0.2 * np.sin(2 * np.pi * date.dayofyear / 365)
-                weekly_factor = 1 + 0.1 * np.sin(2 * np.pi * date.weekday() / 7)
-                random_factor = 1 + random.uniform(-0.15, 0.15)
-                
-                price = base_price * seasonal_factor * weekly_factor * random_factor
-                
-                trends_data.append({
-                    'date': date,
-                    'route': route,
-                    'price': round(price, 2),
-                    'demand_score': random.randint(60, 100),
-                    'bookings': random.randint(100, 1000)
-                })
-        
-        return pd.DataFrame(trends_data)
+        super().__init__(delay_range=(0.5, 1.5), flight_count_range=(3, 8))
 
 class GeminiAnalyzer:
     def __init__(self, api_key: str):
@@ -245,7 +159,8 @@ def main():
     """, unsafe_allow_html=True)
     
     # Initialize classes
-    scraper = AirlineDataScraper()
+    scraper = create_data_source(AirlineDataScraper())
+    figure_cache = get_figure_cache()
     
     # Sidebar for configuration
     with st.sidebar:
@@ -279,15 +194,24 @@ def main():
         auto_refresh = st.checkbox("Auto-refresh data (30s)", value=False)
         
         if st.button("🔄 Refresh Data"):
+            st.session_state['force_refresh'] = True
             st.rerun()
+        force_refresh = st.session_state.pop('force_refresh', False)
     
     # Main content area
     if analysis_type == "Route Analysis":
         st.header(f"📊 Route Analysis: {origin} → {destination}")
         
-        # Fetch and display route data
+        # Fetch and display route data, served from the shared cache when warm
+        route_cache = get_route_cache()
+        prefetcher = get_prefetcher(scraper, route_cache)
         with st.spinner("Fetching real-time flight data..."):
-            route_data = scraper.scrape_flight_data(origin, destination, travel_date.strftime("%Y-%m-%d"))
+            # Refresh Data refetches; auto-refresh serves nothing older than its own interval
+            max_age = 0 if force_refresh else (30 if auto_refresh else None)
+            route_data = get_route_data(scraper, route_cache, origin, destination, travel_date.strftime("%Y-%m-%d"),
+                                        prefetcher, max_age)
+        fare_index = get_fare_index()
+        fare_index.add(route_data)
         
         # Display key metrics
         col1, col2, col3, col4 = st.columns(4)
@@ -306,15 +230,23 @@ def main():
         
         # Flight details table
         st.subheader("🛫 Available Flights")
-        flights_df = pd.DataFrame(route_data['flights'])
-        st.dataframe(flights_df, use_container_width=True)
+        flight_table = get_flight_table(route_data)
+        flights_df = flight_table.frame
+        render_flight_table(flight_table)
         
         # Price distribution chart
         st.subheader("💰 Price Distribution")
-        fig_price = px.histogram(flights_df, x='price', nbins=10, title="Flight Price Distribution")
-        fig_price.update_layout(showlegend=False)
+        fig_price = figure_cache.get(
+            'price_distribution', flights_df[['price']],
+            lambda df: px.histogram(df, x='price', nbins=10, title="Flight Price Distribution").update_layout(showlegend=False),
+            append=lambda fig, rows: extend_traces(fig, rows, x='price')
+        )
         st.plotly_chart(fig_price, use_container_width=True)
         
+        # Cheapest day to fly over the coming weeks
+        st.subheader("📅 Fare Calendar")
+        render_fare_calendar(fare_index, scraper, route_cache, origin, destination, datetime.now().date())
+        
         # AI Analysis
         if api_key:
             st.subheader("🤖 AI Market Analysis")
@@ -327,6 +259,11 @@ def main():
                 {analysis}
             </div>
             """, unsafe_allow_html=True)
+        
+        # Warm the likely next selections while the analyst reads this one
+        prefetcher.prefetch(origin, destination, travel_date)
+        st.caption(f"⚡ Prefetch hit rate: {prefetcher.hit_rate:.0%} "
+                   f"({prefetcher.stats['hits']} of {prefetcher.stats['lookups']} lookups served by prefetching)")
     
     elif analysis_type == "Price Trends":
         st.header("📈 Price Trends Analysis")
@@ -336,18 +273,24 @@ def main():
             trends_df = scraper.get_price_trends(30)
         
         # Price trends over time
-        fig_trends = px.line(trends_df, x='date', y='price', color='route', 
-                           title="Price Trends Over Last 30 Days")
+        fig_trends = figure_cache.get(
+            'price_trends', trends_df,
+            lambda df: px.line(drop_unused_categories(df), x='date', y='price', color='route',
+                               title="Price Trends Over Last 30 Days"),
+            append=lambda fig, rows: extend_traces(fig, rows, x='date', y='price', color='route')
+        )
         st.plotly_chart(fig_trends, use_container_width=True)
         
         # Average prices by route
-        avg_prices = trends_df.groupby('route')['price'].mean().sort_values(ascending=False)
-        fig_avg = px.bar(x=avg_prices.index, y=avg_prices.values, 
-                        title="Average Prices by Route")
+        avg_prices = trends_df.groupby('route', observed=True)['price'].mean().sort_values(ascending=False)
+        fig_avg = figure_cache.get(
+            'average_prices', avg_prices.reset_index(),
+            lambda df: px.bar(df, x='route', y='price', title="Average Prices by Route")
+        )
         st.plotly_chart(fig_avg, use_container_width=True)
         
         # Price volatility
-        price_volatility = trends_df.groupby('route')['price'].std().sort_values(ascending=False)
+        price_volatility = trends_df.groupby('route', observed=True)['price'].std().sort_values(ascending=False)
         
         col1, col2 = st.columns(2)
         with col1:
@@ -368,18 +311,20 @@ def main():
             popularity_data = scraper.get_route_popularity()
         
         # Convert to DataFrame for analysis
-        popularity_df = pd.DataFrame(popularity_data).T
-        popularity_df.index.name = 'Route'
-        popularity_df.reset_index(inplace=True)
+        popularity_df = build_popularity_frame(popularity_data)
         
         # Top routes by searches
-        fig_searches = px.bar(popularity_df.head(10), x='Route', y='weekly_searches',
-                             title="Top 10 Routes by Weekly Searches")
-        fig_searches.update_xaxis(tickangle=45)
+        fig_searches = figure_cache.get(
+            'top_routes', popularity_df.head(10)[['route', 'weekly_searches']],
+            lambda df: px.bar(df, x='route', y='weekly_searches', title="Top 10 Routes by Weekly Searches",
+                              labels={'route': 'Route'}).update_xaxes(tickangle=45)
+        )
         st.plotly_chart(fig_searches, use_container_width=True)
         
         # Booking conversion rate
-        popularity_df['conversion_rate'] = (popularity_df['bookings'] / popularity_df['weekly_searches'] * 100).round(2)
+        # Routes with no measured searches have no rate rather than an infinite one
+        searches = popularity_df['weekly_searches'].where(popularity_df['weekly_searches'] > 0)
+        popularity_df['conversion_rate'] = (popularity_df['bookings'] / searches * 100).round(2)
         
         # Market metrics
         col1, col2, col3 = st.columns(3)
@@ -391,7 +336,8 @@ def main():
             st.metric("Total Bookings", f"{popularity_df['bookings'].sum():,}")
         
         with col3:
-            st.metric("Average Conversion Rate", f"{popularity_df['conversion_rate'].mean():.1f}%")
+            average_rate = popularity_df['conversion_rate'].mean()
+            st.metric("Average Conversion Rate", f"{average_rate:.1f}%" if pd.notna(average_rate) else "n/a")
         
         # Detailed market data
         st.subheader("📊 Detailed Market Data")
@@ -399,8 +345,11 @@ def main():
         
         # Demand trends
         demand_summary = popularity_df['demand_trend'].value_counts()
-        fig_demand = px.pie(values=demand_summary.values, names=demand_summary.index,
-                           title="Market Demand Trends")
+        demand_summary = demand_summary[demand_summary > 0]
+        fig_demand = figure_cache.get(
+            'demand_trends', demand_summary.rename_axis('demand_trend').reset_index(name='routes'),
+            lambda df: px.pie(df, values='routes', names='demand_trend', title="Market Demand Trends")
+        )
         st.plotly_chart(fig_demand, use_container_width=True)
     
     elif analysis_type == "AI Recommendations":
@@ -437,6 +386,10 @@ def main():
                 </div>
                 """, unsafe_allow_html=True)
     
+    st.caption(f"🖼️ Figure cache: {figure_cache.reuse_rate:.0%} of charts this session reused or patched "
+               f"({figure_cache.stats['reused']} reused, {figure_cache.stats['patched']} patched, "
+               f"{figure_cache.stats['rebuilt']} rebuilt)")
+    
     # Footer
     st.markdown("---")
     st.markdown("""
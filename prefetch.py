@@ -0,0 +1,128 @@
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import streamlit as st
+
+from data_sources import DataSourceBackend
+from route_cache import RouteCache
+
+RouteKey = Tuple[str, str, str]
+
+
+class Prefetcher:
+    """Fetch the selections an analyst is likely to make next into the route cache, in the background"""
+
+    def __init__(self, data_source: DataSourceBackend, route_cache: RouteCache, days: int = 2,
+                 popular_destinations: int = 3, max_fetches: int = 8, workers: int = 2,
+                 popularity_ttl: float = 600):
+        self.data_source = data_source
+        self.route_cache = route_cache
+        self.days = days
+        self.popular_destinations = popular_destinations
+        self.max_fetches = max_fetches
+        self.popularity_ttl = popularity_ttl
+        self.stats = {'lookups': 0, 'hits': 0, 'prefetched': 0, 'failed': 0}
+
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='prefetch')
+        self._lock = threading.Lock()
+        self._in_flight: Dict[RouteKey, Future] = {}
+        self._prefetched: Dict[RouteKey, float] = {}
+        self._popularity: Dict = {}
+        self._popularity_loaded = 0.0
+
+    def _popular_routes(self) -> Dict:
+        if time.time() - self._popularity_loaded > self.popularity_ttl:
+            self._popularity = self.data_source.get_route_popularity()
+            self._popularity_loaded = time.time()
+        return self._popularity
+
+    def candidates(self, origin: str, destination: str, travel_date: date) -> List[RouteKey]:
+        """Likely next selections, most likely first: nearby dates, the reverse route, then popular destinations"""
+        candidates = []
+        for offset in range(1, self.days + 1):
+            candidates += [(origin, destination, travel_date + timedelta(days=offset)),
+                           (origin, destination, travel_date - timedelta(days=offset))]
+        candidates.append((destination, origin, travel_date))
+
+        popular = sorted(
+            ((data['weekly_searches'], route.split(' → ')[1]) for route, data in self._popular_routes().items()
+             if route.startswith(f"{origin} → ")),
+            reverse=True
+        )
+        candidates += [(origin, city, travel_date) for _, city in popular[:self.popular_destinations] if city != destination]
+
+        today = datetime.now().date()
+        return [(o, d, day.strftime("%Y-%m-%d")) for o, d, day in candidates if day >= today]
+
+    def _forget_stale(self):
+        """Stop tracking prefetches nobody selected once their date has passed or their cache entry expired"""
+        today = datetime.now().strftime("%Y-%m-%d")
+        expired = time.time() - self.route_cache.max_age
+        with self._lock:
+            for key in [key for key, fetched_at in self._prefetched.items() if key[2] < today or fetched_at < expired]:
+                del self._prefetched[key]
+
+    def prefetch(self, origin: str, destination: str, travel_date: date):
+        """Queue uncached candidates for the current selection, up to the fetch budget"""
+        self._forget_stale()
+        queued = 0
+        for key in self.candidates(origin, destination, travel_date):
+            if queued >= self.max_fetches:
+                break
+            if self.route_cache.get(*key) is not None:
+                continue
+            with self._lock:
+                if key in self._in_flight:
+                    continue
+                self._in_flight[key] = self._pool.submit(self._fetch, key)
+            queued += 1
+
+    def _fetch(self, key: RouteKey) -> Optional[Dict]:
+        try:
+            route_data = self.data_source.scrape_flight_data(*key)
+            self.route_cache.put(*key, route_data, source='prefetch')
+            with self._lock:
+                self._prefetched[key] = time.time()
+                self.stats['prefetched'] += 1
+            return route_data
+        except Exception:
+            with self._lock:
+                self.stats['failed'] += 1
+            return None
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def pending(self, key: RouteKey) -> Optional[Future]:
+        """The in-flight prefetch for a selection, so a render can wait on it instead of fetching twice"""
+        with self._lock:
+            return self._in_flight.get(key)
+
+    def record_lookup(self, key: RouteKey, hit: bool):
+        """Count a new selection's lookup; it is a prefetch hit if it was served by data a prefetch stored"""
+        with self._lock:
+            self.stats['lookups'] += 1
+            if hit and key in self._prefetched:
+                self.stats['hits'] += 1
+            # Later lookups of the same selection are ordinary cache hits or fresh fetches
+            self._prefetched.pop(key, None)
+
+    @property
+    def hit_rate(self) -> float:
+        return self.stats['hits'] / self.stats['lookups'] if self.stats['lookups'] else 0.0
+
+
+@st.cache_resource
+def get_prefetcher(_data_source: DataSourceBackend, _route_cache: RouteCache) -> Prefetcher:
+    """Prefetcher shared by every session; its budget comes from AIRLINE_PREFETCH_* variables"""
+    return Prefetcher(
+        _data_source, _route_cache,
+        days=int(os.environ.get('AIRLINE_PREFETCH_DAYS', 2)),
+        popular_destinations=int(os.environ.get('AIRLINE_PREFETCH_POPULAR', 3)),
+        max_fetches=int(os.environ.get('AIRLINE_PREFETCH_MAX', 8)),
+        workers=int(os.environ.get('AIRLINE_PREFETCH_WORKERS', 2))
+    )
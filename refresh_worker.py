@@ -0,0 +1,156 @@
+"""Background worker that keeps every route warm in the shared route cache.
+
+Refreshes all origin/destination pairs for the next N days on a schedule
+weighted by route popularity: busy routes refresh more often, and every
+refresh is staggered so the load is spread evenly over each cycle. No
+route waits longer than the route cache's max age between refreshes. The
+dashboards read the same cache, so renders rarely wait on a fetch.
+
+    python refresh_worker.py --days 14 --workers 4 --cycle-minutes 60
+"""
+import argparse
+import heapq
+import itertools
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+
+from data_sources import DataSourceBackend, create_data_source
+from route_cache import RouteCache
+
+Route = Tuple[str, str]
+
+logger = logging.getLogger('refresh_worker')
+
+# Fraction of the route cache's max age after which an entry is refreshed
+REFRESH_MARGIN = 0.9
+
+
+def all_routes(airports: Dict[str, str]) -> List[Route]:
+    """Every ordered origin/destination pair"""
+    return list(itertools.permutations(airports.keys(), 2))
+
+
+def route_weights(data_source: DataSourceBackend, routes: List[Route]) -> Dict[Route, float]:
+    """Weekly searches per route, at least 1; routes without popularity data get half the quietest route's weight"""
+    popularity = data_source.get_route_popularity()
+    # Measured popularity is 0 for routes with no logged events, which would make intervals divide by zero
+    searches = {route: max(float(data['weekly_searches']), 1.0) for route, data in popularity.items()}
+    floor = max(min(searches.values()) / 2, 1.0) if searches else 1.0
+    return {(origin, destination): searches.get(f"{origin} → {destination}", floor) for origin, destination in routes}
+
+
+class RefreshScheduler:
+    """Priority queue of (route, day offset) refreshes, due more often for popular routes"""
+
+    def __init__(self, routes: List[Route], days: int, cycle_seconds: float, weights: Dict[Route, float],
+                 max_interval: float = float('inf')):
+        self.days = days
+        self.cycle_seconds = cycle_seconds
+        self.max_interval = max_interval
+        self.set_weights(weights)
+        self._sequence = itertools.count()
+        self.queue = []
+
+        # Stagger first refreshes across each route's interval so they don't all fire at once
+        now = time.time()
+        for route_index, route in enumerate(routes):
+            interval = self.interval(route)
+            for day_offset in range(days):
+                phase = (day_offset + route_index / len(routes)) / days
+                self.push(now + interval * phase, route, day_offset)
+
+    def set_weights(self, weights: Dict[Route, float]):
+        self.weights = weights
+        self.mean_weight = sum(weights.values()) / len(weights)
+
+    def interval(self, route: Route) -> float:
+        """Seconds between refreshes: one cycle for an average route, clamped to 4x either way and to max_interval"""
+        ratio = self.mean_weight / self.weights[route]
+        return min(self.cycle_seconds * min(max(ratio, 0.25), 4.0), self.max_interval)
+
+    def push(self, due: float, route: Route, day_offset: int):
+        heapq.heappush(self.queue, (due, next(self._sequence), route, day_offset))
+
+    def next_due(self) -> float:
+        return self.queue[0][0] if self.queue else float('inf')
+
+    def pop_due(self, now: float):
+        """Pop the next refresh if it is due, or return None"""
+        if not self.queue or self.queue[0][0] > now:
+            return None
+        due, _, route, day_offset = heapq.heappop(self.queue)
+        return due, route, day_offset
+
+
+def refresh_route(data_source: DataSourceBackend, route_cache: RouteCache, route: Route, day_offset: int):
+    origin, destination = route
+    travel_date = (datetime.now() + timedelta(days=day_offset)).strftime("%Y-%m-%d")
+    route_data = data_source.scrape_flight_data(origin, destination, travel_date)
+    route_cache.put(origin, destination, travel_date, route_data, source='worker')
+
+
+def run(days: int, workers: int, cycle_seconds: float, once: bool = False):
+    data_source = create_data_source()
+    route_cache = RouteCache()
+    routes = all_routes(data_source.australian_airports)
+    # A one-off warm-up makes every refresh due immediately
+    # Refresh every entry before the dashboards start treating it as stale, leaving time for the fetch itself
+    max_interval = route_cache.max_age * REFRESH_MARGIN
+    scheduler = RefreshScheduler(routes, days, 0 if once else cycle_seconds, route_weights(data_source, routes),
+                                 max_interval)
+    logger.info("Keeping %d routes x %d days warm with %d workers", len(routes), days, workers)
+
+    next_weights_update = time.time() + cycle_seconds
+    purged_for = None
+    in_flight = set()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while scheduler.queue or in_flight:
+            now = time.time()
+
+            today = datetime.now().date()
+            if purged_for != today:
+                route_cache.purge_before(today)
+                purged_for = today
+
+            if not once and now >= next_weights_update:
+                scheduler.set_weights(route_weights(data_source, routes))
+                next_weights_update = now + cycle_seconds
+
+            while len(in_flight) < workers:
+                job = scheduler.pop_due(now)
+                if job is None:
+                    break
+                due, route, day_offset = job
+                in_flight.add(pool.submit(refresh_route, data_source, route_cache, route, day_offset))
+                if not once:
+                    # Keep the regular cadence, but don't pile up refreshes after falling behind
+                    scheduler.push(max(due + scheduler.interval(route), now), route, day_offset)
+
+            timeout = min(max(scheduler.next_due() - time.time(), 0.05), 1.0)
+            if not in_flight:
+                time.sleep(timeout)
+                continue
+            done, in_flight = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception():
+                    logger.warning("Refresh failed: %s", future.exception())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keep every route warm in the shared route cache")
+    parser.add_argument('--days', type=int, default=14, help="Travel dates to keep warm, starting today")
+    parser.add_argument('--workers', type=int, default=4, help="Concurrent fetches")
+    parser.add_argument('--cycle-minutes', type=float, default=60, help="Refresh interval for an average route")
+    parser.add_argument('--once', action='store_true', help="Warm every route once, as fast as workers allow, then exit")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(name)s %(message)s')
+    run(args.days, args.workers, args.cycle_minutes * 60, args.once)
+
+
+if __name__ == '__main__':
+    main()
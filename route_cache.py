@@ -0,0 +1,112 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import date
+from typing import Dict, List, Optional
+
+import streamlit as st
+
+from data_sources import DataSourceBackend, json_default
+
+DEFAULT_ROUTE_CACHE = 'airline_route_cache.sqlite3'
+DEFAULT_MAX_AGE = 3600
+
+
+class RouteCache:
+    """Route data shared between the refresh worker and every dashboard session, stored in SQLite"""
+
+    def __init__(self, path: Optional[str] = None, max_age: Optional[float] = None):
+        self.path = path or os.environ.get('AIRLINE_ROUTE_CACHE', DEFAULT_ROUTE_CACHE)
+        # Seconds an entry is served before it counts as a miss
+        self.max_age = max_age if max_age is not None else float(os.environ.get('AIRLINE_ROUTE_MAX_AGE', DEFAULT_MAX_AGE))
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS route_data (
+                    origin TEXT NOT NULL,
+                    destination TEXT NOT NULL,
+                    travel_date TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    PRIMARY KEY (origin, destination, travel_date)
+                )
+            """)
+
+    def _connection(self) -> sqlite3.Connection:
+        """One connection per thread; WAL lets readers proceed while the worker writes"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, origin: str, destination: str, travel_date: str, max_age: Optional[float] = None) -> Optional[Dict]:
+        """Cached scrape_flight_data result for one route and date, or None if missing or older than max_age"""
+        max_age = self.max_age if max_age is None else max_age
+        row = self._connection().execute(
+            "SELECT payload FROM route_data WHERE origin = ? AND destination = ? AND travel_date = ? AND fetched_at >= ?",
+            (origin, destination, travel_date, time.time() - max_age)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_range(self, origin: str, destination: str, start: date, end: date,
+                  max_age: Optional[float] = None) -> List[Dict]:
+        """Cached results for one route between two dates inclusive, skipping entries older than max_age"""
+        max_age = self.max_age if max_age is None else max_age
+        rows = self._connection().execute(
+            "SELECT payload FROM route_data WHERE origin = ? AND destination = ? AND travel_date BETWEEN ? AND ?"
+            " AND fetched_at >= ?",
+            (origin, destination, start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d"), time.time() - max_age)
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def put(self, origin: str, destination: str, travel_date: str, route_data: Dict, source: str = 'worker'):
+        """Store or replace the result for one route and date"""
+        payload = json.dumps(route_data, default=json_default, separators=(',', ':'))
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO route_data VALUES (?, ?, ?, ?, ?, ?)",
+                (origin, destination, travel_date, payload, source, time.time())
+            )
+
+    def purge_before(self, travel_date: date):
+        """Drop entries for dates that have already passed"""
+        with self._connection() as conn:
+            conn.execute("DELETE FROM route_data WHERE travel_date < ?", (travel_date.strftime("%Y-%m-%d"),))
+
+
+@st.cache_resource
+def get_route_cache() -> RouteCache:
+    """Route cache shared by every session on this server"""
+    return RouteCache()
+
+
+def get_route_data(data_source: DataSourceBackend, route_cache: RouteCache,
+                   origin: str, destination: str, travel_date: str, prefetcher=None,
+                   max_age: Optional[float] = None) -> Dict:
+    """Serve route data from the cache, fetching and storing it on a miss or when stale.
+
+    max_age overrides the cache's own limit, e.g. 0 to force a refetch.
+    With a prefetcher, a selection it is already fetching is awaited rather
+    than fetched twice, and each new selection in a session counts towards
+    its hit rate; reruns of the same selection from other widgets don't.
+    """
+    key = (origin, destination, travel_date)
+    route_data = route_cache.get(*key, max_age=max_age)
+    if prefetcher is not None:
+        if route_data is None:
+            pending = prefetcher.pending(key)
+            # A prefetch that finished since the first lookup is in the cache by now
+            route_data = pending.result() if pending is not None else route_cache.get(*key, max_age=max_age)
+        if st.session_state.get('last_route_key') != key:
+            st.session_state['last_route_key'] = key
+            prefetcher.record_lookup(key, hit=route_data is not None)
+    if route_data is None:
+        route_data = data_source.scrape_flight_data(*key)
+        route_cache.put(*key, route_data, source='ui')
+    return route_data
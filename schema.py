@@ -0,0 +1,106 @@
+from typing import Dict, List, Optional
+
+import pandas as pd
+from pandas.api.types import CategoricalDtype
+
+AUSTRALIAN_AIRPORTS = {
+    'Sydney': 'SYD', 'Melbourne': 'MEL', 'Brisbane': 'BNE', 'Perth': 'PER',
+    'Adelaide': 'ADL', 'Gold Coast': 'OOL', 'Cairns': 'CNS', 'Darwin': 'DRW',
+    'Hobart': 'HBA', 'Canberra': 'CBR'
+}
+
+AIRLINES = ['Qantas', 'Jetstar', 'Virgin Australia', 'Tigerair', 'Rex Airlines']
+AIRCRAFT = ['Boeing 737', 'Airbus A320', 'Boeing 787', 'Airbus A330']
+
+# Shared category dictionaries, so every frame stores these columns as small integer codes
+ROUTE_DTYPE = CategoricalDtype([
+    f"{origin} → {destination}" for origin in AUSTRALIAN_AIRPORTS for destination in AUSTRALIAN_AIRPORTS
+    if origin != destination
+])
+TREND_ROUTE_DTYPE = CategoricalDtype([
+    f"{origin}-{destination}" for origin in AUSTRALIAN_AIRPORTS for destination in AUSTRALIAN_AIRPORTS
+    if origin != destination
+])
+AIRLINE_DTYPE = CategoricalDtype(AIRLINES)
+AIRCRAFT_DTYPE = CategoricalDtype(AIRCRAFT)
+AVAILABILITY_DTYPE = CategoricalDtype(['Available', 'Limited', 'Sold Out'])
+DEMAND_TREND_DTYPE = CategoricalDtype(['Increasing', 'Stable', 'Decreasing'])
+PEAK_SEASON_DTYPE = CategoricalDtype(['Summer', 'Winter', 'Year-round'])
+
+# Column -> dtype; optional columns are typed when present
+FLIGHTS_SCHEMA = {
+    'airline': AIRLINE_DTYPE,
+    'price': 'float64',
+    'departure_time': 'object',
+    'duration': 'object',
+    'aircraft': AIRCRAFT_DTYPE,
+    'availability': AVAILABILITY_DTYPE
+}
+
+TRENDS_SCHEMA = {
+    'date': 'datetime64[ns]',
+    'route': TREND_ROUTE_DTYPE,
+    'price': 'float64',
+    'demand_score': 'int16',
+    'bookings': 'int32'
+}
+
+POPULARITY_SCHEMA = {
+    'route': ROUTE_DTYPE,
+    'weekly_searches': 'int64',
+    'bookings': 'int64',
+    'avg_price': 'float64',
+    'demand_trend': DEMAND_TREND_DTYPE,
+    'peak_season': PEAK_SEASON_DTYPE
+}
+POPULARITY_OPTIONAL = {
+    'conversion_rate': 'float64',
+    'unique_searchers': 'int64'
+}
+
+
+def build_frame(records, schema: Dict, optional: Optional[Dict] = None) -> pd.DataFrame:
+    """Build a DataFrame with fixed dtypes, validating it against the schema once.
+
+    Raises ValueError if a required column is missing or a categorical
+    column holds a value outside its shared dictionary.
+    """
+    optional = optional or {}
+    frame = pd.DataFrame(records)
+    if frame.empty and not len(frame.columns):
+        frame = pd.DataFrame(columns=list(schema))
+
+    missing = [column for column in schema if column not in frame.columns]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+
+    dtypes = {column: dtype for column, dtype in {**schema, **optional}.items() if column in frame.columns}
+    for column, dtype in dtypes.items():
+        if isinstance(dtype, CategoricalDtype):
+            values = frame[column]
+            unknown = set(values[values.notna() & ~values.isin(dtype.categories)])
+            if unknown:
+                raise ValueError(f"Unknown {column} values: {', '.join(sorted(map(str, unknown)))}")
+
+    return frame.astype(dtypes)
+
+
+def build_flights_frame(flights: List[Dict]) -> pd.DataFrame:
+    return build_frame(flights, FLIGHTS_SCHEMA)
+
+
+def build_trends_frame(trends) -> pd.DataFrame:
+    return build_frame(trends, TRENDS_SCHEMA)
+
+
+def build_popularity_frame(popularity_data: Dict) -> pd.DataFrame:
+    """One row per route from get_route_popularity output"""
+    records = [{'route': route, **data} for route, data in popularity_data.items()]
+    return build_frame(records, POPULARITY_SCHEMA, POPULARITY_OPTIONAL)
+
+
+def drop_unused_categories(frame: pd.DataFrame) -> pd.DataFrame:
+    """Frame whose categorical columns list only values that occur, as Plotly Express grouping expects"""
+    return frame.assign(**{
+        column: frame[column].cat.remove_unused_categories() for column in frame.select_dtypes('category')
+    })
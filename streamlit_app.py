@@ -1,12 +1,18 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
 import time
-import random
 from typing import Dict, List
+from data_sources import SimulatedDataSource, create_data_source
+from flights_table import get_flight_table, render_flight_table
+from schema import build_popularity_frame, drop_unused_categories
+from figure_cache import extend_traces, get_figure_cache
+from fare_index import get_fare_index, render_fare_calendar
+from route_cache import get_route_cache, get_route_data
+from prefetch import get_prefetcher
+from insight_rules import OPPORTUNITY_RULES, ROUTE_INSIGHT_RULES, evaluate_rules
 
 # Configure page
 st.set_page_config(
@@ -62,115 +68,27 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-class AirlineDataGenerator:
+class AirlineDataGenerator(SimulatedDataSource):
     def __init__(self):
-        self.australian_airports = {
-            'Sydney': 'SYD', 'Melbourne': 'MEL', 'Brisbane': 'BNE', 'Perth': 'PER',
-            'Adelaide': 'ADL', 'Gold Coast': 'OOL', 'Cairns': 'CNS', 'Darwin': 'DRW',
-            'Hobart': 'HBA', 'Canberra': 'CBR'
-        }
-        
-    def generate_flight_data(self, origin: str, destination: str, date: str) -> Dict:
-        """Generate realistic flight data"""
-        # Simulate API delay
-        time.sleep(random.uniform(0.5, 1.0))
-        
-        # Generate realistic flight data
-        airlines = ['Qantas', 'Jetstar', 'Virgin Australia', 'Tigerair', 'Rex Airlines']
-        base_price = random.randint(150, 800)
-        
-        flights = []
-        for i in range(random.randint(4, 9)):
-            airline = random.choice(airlines)
-            price = base_price + random.randint(-50, 200)
-            departure_time = f"{random.randint(6, 22):02d}:{random.choice(['00', '15', '30', '45'])}"
-            duration = f"{random.randint(1, 8)}h {random.randint(0, 59)}m"
-            
-            flights.append({
-                'airline': airline,
-                'price': price,
-                'departure_time': departure_time,
-                'duration': duration,
-                'aircraft': random.choice(['Boeing 737', 'Airbus A320', 'Boeing 787', 'Airbus A330']),
-                'availability': random.choice(['Available', 'Available', 'Available', 'Limited', 'Sold Out'])
-            })
-        
-        return {
-            'route': f"{origin} → {destination}",
-            'date': date,
-            'flights': flights,
-            'avg_price': np.mean([f['price'] for f in flights]),
-            'min_price': min([f['price'] for f in flights]),
-            'max_price': max([f['price'] for f in flights]),
-            'total_flights': len(flights),
-            'demand_level': random.choice(['High', 'Medium', 'Low']),
-            'peak_times': ['08:00-10:00', '17:00-19:00', '12:00-14:00']
-        }
-    
-    def get_route_popularity(self) -> Dict:
-        """Generate route popularity data"""
-        routes = [
-            'Sydney → Melbourne', 'Melbourne → Sydney', 'Sydney → Brisbane',
-            'Brisbane → Sydney', 'Perth → Sydney', 'Sydney → Perth',
-            'Melbourne → Brisbane', 'Brisbane → Melbourne', 'Adelaide → Melbourne',
-            'Melbourne → Adelaide', 'Sydney → Gold Coast', 'Gold Coast → Sydney'
-        ]
-        
-        popularity_data = {}
-        for route in routes:
-            popularity_data[route] = {
-                'weekly_searches': random.randint(5000, 50000),
-                'bookings': random.randint(1000, 10000),
-                'avg_price': random.randint(200, 600),
-                'demand_trend': random.choice(['Increasing', 'Stable', 'Decreasing']),
-                'peak_season': random.choice(['Summer', 'Winter', 'Year-round']),
-                'conversion_rate': round(random.uniform(15, 35), 1)
-            }
-        
-        return popularity_data
-    
-    def get_price_trends(self, days: int = 30) -> pd.DataFrame:
-        """Generate price trend data"""
-        dates = pd.date_range(start=datetime.now() - timedelta(days=days), end=datetime.now(), freq='D')
-        
-        trends_data = []
-        for date in dates:
-            for route in ['Sydney-Melbourne', 'Sydney-Brisbane', 'Melbourne-Brisbane', 'Sydney-Perth']:
-                base_price = {'Sydney-Melbourne': 300, 'Sydney-Brisbane': 350, 'Melbourne-Brisbane': 280, 'Sydney-Perth': 450}[route]
-                
-                # Add seasonal and weekly variations
-                seasonal_factor = 1 + 0.2 * np.sin(2 * np.pi * date.dayofyear / 365)
-                weekly_factor = 1 + 0.1 * np.sin(2 * np.pi * date.weekday() / 7)
-                random_factor = 1 + random.uniform(-0.15, 0.15)
-                
-                price = base_price * seasonal_factor * weekly_factor * random_factor
-                
-                trends_data.append({
-                    'date': date,
-                    'route': route,
-                    'price': round(price, 2),
-                    'demand_score': random.randint(60, 100),
-                    'bookings': random.randint(100, 1000)
-                })
-        
-        return pd.DataFrame(trends_data)
+        super().__init__(
+            delay_range=(0.5, 1.0),
+            flight_count_range=(4, 9),
+            availability_options=['Available', 'Available', 'Available', 'Limited', 'Sold Out'],
+            include_conversion_rate=True
+        )
 
 def generate_insights(data: Dict) -> str:
     """Generate basic market insights"""
-    insights = []
-    
-    if data['demand_level'] == 'High':
-        insights.append(f"🔥 **High Demand Alert**: {data['route']} shows strong booking activity")
-        insights.append(f"💰 **Pricing Opportunity**: Average price ${data['avg_price']:.0f} indicates premium market")
-    elif data['demand_level'] == 'Medium':
-        insights.append(f"📊 **Stable Market**: {data['route']} has moderate demand patterns")
-        insights.append(f"⚖️ **Balanced Pricing**: Price range ${data['min_price']:.0f}-${data['max_price']:.0f} shows competitive market")
-    else:
-        insights.append(f"📉 **Lower Demand**: {data['route']} may have capacity for promotional pricing")
-        insights.append(f"🎯 **Opportunity**: Consider targeting this route for hostel marketing")
-    
-    insights.append(f"✈️ **Flight Availability**: {data['total_flights']} flights available")
-    insights.append(f"⏰ **Peak Times**: Best booking windows are {', '.join(data['peak_times'])}")
+    route_df = pd.DataFrame([{
+        'route': data['route'],
+        'avg_price': data['avg_price'],
+        'min_price': data['min_price'],
+        'max_price': data['max_price'],
+        'total_flights': data['total_flights'],
+        'demand_level': data['demand_level'],
+        'peak_times': ', '.join(data['peak_times'])
+    }])
+    insights = evaluate_rules(route_df, ROUTE_INSIGHT_RULES)['message']
     
     return "\n".join([f"- {insight}" for insight in insights])
 
@@ -184,7 +102,8 @@ def main():
     """, unsafe_allow_html=True)
     
     # Initialize data generator
-    data_generator = AirlineDataGenerator()
+    data_generator = create_data_source(AirlineDataGenerator())
+    figure_cache = get_figure_cache()
     
     # Sidebar for configuration
     with st.sidebar:
@@ -204,15 +123,24 @@ def main():
         auto_refresh = st.checkbox("Auto-refresh data (30s)", value=False)
         
         if st.button("🔄 Refresh Data"):
+            st.session_state['force_refresh'] = True
             st.rerun()
+        force_refresh = st.session_state.pop('force_refresh', False)
     
     # Main content area
     if analysis_type == "Route Analysis":
         st.header(f"📊 Route Analysis: {origin} → {destination}")
         
-        # Fetch and display route data
+        # Fetch and display route data, served from the shared cache when warm
+        route_cache = get_route_cache()
+        prefetcher = get_prefetcher(data_generator, route_cache)
         with st.spinner("Fetching real-time flight data..."):
-            route_data = data_generator.generate_flight_data(origin, destination, travel_date.strftime("%Y-%m-%d"))
+            # Refresh Data refetches; auto-refresh serves nothing older than its own interval
+            max_age = 0 if force_refresh else (30 if auto_refresh else None)
+            route_data = get_route_data(data_generator, route_cache, origin, destination, travel_date.strftime("%Y-%m-%d"),
+                                        prefetcher, max_age)
+        fare_index = get_fare_index()
+        fare_index.add(route_data)
         
         # Display key metrics
         col1, col2, col3, col4 = st.columns(4)
@@ -231,19 +159,31 @@ def main():
         
         # Flight details table
         st.subheader("🛫 Available Flights")
-        flights_df = pd.DataFrame(route_data['flights'])
-        st.dataframe(flights_df, use_container_width=True)
+        flight_table = get_flight_table(route_data)
+        flights_df = flight_table.frame
+        render_flight_table(flight_table)
         
         # Price distribution chart
         st.subheader("💰 Price Distribution")
-        fig_price = px.histogram(flights_df, x='price', nbins=10, title="Flight Price Distribution")
-        fig_price.update_layout(showlegend=False)
+        fig_price = figure_cache.get(
+            'price_distribution', flights_df[['price']],
+            lambda df: px.histogram(df, x='price', nbins=10, title="Flight Price Distribution").update_layout(showlegend=False),
+            append=lambda fig, rows: extend_traces(fig, rows, x='price')
+        )
         st.plotly_chart(fig_price, use_container_width=True)
         
+        # Cheapest day to fly over the coming weeks
+        st.subheader("📅 Fare Calendar")
+        render_fare_calendar(fare_index, data_generator, route_cache, origin, destination, datetime.now().date())
+        
         # Airline market share
         st.subheader("📊 Airline Market Share")
         airline_counts = flights_df['airline'].value_counts()
-        fig_airline = px.pie(values=airline_counts.values, names=airline_counts.index, title="Market Share by Airline")
+        airline_counts = airline_counts[airline_counts > 0]
+        fig_airline = figure_cache.get(
+            'airline_share', airline_counts.rename_axis('airline').reset_index(name='flights'),
+            lambda df: px.pie(df, values='flights', names='airline', title="Market Share by Airline")
+        )
         st.plotly_chart(fig_airline, use_container_width=True)
         
         # Market Analysis
@@ -255,6 +195,11 @@ def main():
             {insights}
         </div>
         """, unsafe_allow_html=True)
+        
+        # Warm the likely next selections while the analyst reads this one
+        prefetcher.prefetch(origin, destination, travel_date)
+        st.caption(f"⚡ Prefetch hit rate: {prefetcher.hit_rate:.0%} "
+                   f"({prefetcher.stats['hits']} of {prefetcher.stats['lookups']} lookups served by prefetching)")
     
     elif analysis_type == "Price Trends":
         st.header("📈 Price Trends Analysis")
@@ -264,18 +209,24 @@ def main():
             trends_df = data_generator.get_price_trends(30)
         
         # Price trends over time
-        fig_trends = px.line(trends_df, x='date', y='price', color='route', 
-                           title="Price Trends Over Last 30 Days")
+        fig_trends = figure_cache.get(
+            'price_trends', trends_df,
+            lambda df: px.line(drop_unused_categories(df), x='date', y='price', color='route',
+                               title="Price Trends Over Last 30 Days"),
+            append=lambda fig, rows: extend_traces(fig, rows, x='date', y='price', color='route')
+        )
         st.plotly_chart(fig_trends, use_container_width=True)
         
         # Average prices by route
-        avg_prices = trends_df.groupby('route')['price'].mean().sort_values(ascending=False)
-        fig_avg = px.bar(x=avg_prices.index, y=avg_prices.values, 
-                        title="Average Prices by Route")
+        avg_prices = trends_df.groupby('route', observed=True)['price'].mean().sort_values(ascending=False)
+        fig_avg = figure_cache.get(
+            'average_prices', avg_prices.reset_index(),
+            lambda df: px.bar(df, x='route', y='price', title="Average Prices by Route")
+        )
         st.plotly_chart(fig_avg, use_container_width=True)
         
         # Price volatility analysis
-        price_volatility = trends_df.groupby('route')['price'].std().sort_values(ascending=False)
+        price_volatility = trends_df.groupby('route', observed=True)['price'].std().sort_values(ascending=False)
         
         col1, col2 = st.columns(2)
         with col1:
@@ -296,14 +247,14 @@ def main():
             popularity_data = data_generator.get_route_popularity()
         
         # Convert to DataFrame for analysis
-        popularity_df = pd.DataFrame(popularity_data).T
-        popularity_df.index.name = 'Route'
-        popularity_df.reset_index(inplace=True)
+        popularity_df = build_popularity_frame(popularity_data)
         
         # Top routes by searches
-        fig_searches = px.bar(popularity_df.head(10), x='Route', y='weekly_searches',
-                             title="Top 10 Routes by Weekly Searches")
-        fig_searches.update_xaxis(tickangle=45)
+        fig_searches = figure_cache.get(
+            'top_routes', popularity_df.head(10)[['route', 'weekly_searches']],
+            lambda df: px.bar(df, x='route', y='weekly_searches', title="Top 10 Routes by Weekly Searches",
+                              labels={'route': 'Route'}).update_xaxes(tickangle=45)
+        )
         st.plotly_chart(fig_searches, use_container_width=True)
         
         # Market metrics
@@ -316,7 +267,8 @@ def main():
             st.metric("Total Bookings", f"{popularity_df['bookings'].sum():,}")
         
         with col3:
-            st.metric("Average Conversion Rate", f"{popularity_df['conversion_rate'].mean():.1f}%")
+            average_rate = popularity_df['conversion_rate'].mean()
+            st.metric("Average Conversion Rate", f"{average_rate:.1f}%" if pd.notna(average_rate) else "n/a")
         
         # Detailed market data
         st.subheader("📊 Detailed Market Data")
@@ -324,8 +276,11 @@ def main():
         
         # Demand trends
         demand_summary = popularity_df['demand_trend'].value_counts()
-        fig_demand = px.pie(values=demand_summary.values, names=demand_summary.index,
-                           title="Market Demand Trends")
+        demand_summary = demand_summary[demand_summary > 0]
+        fig_demand = figure_cache.get(
+            'demand_trends', demand_summary.rename_axis('demand_trend').reset_index(name='routes'),
+            lambda df: px.pie(df, values='routes', names='demand_trend', title="Market Demand Trends")
+        )
         st.plotly_chart(fig_demand, use_container_width=True)
     
     elif analysis_type == "Business Insights":
@@ -339,24 +294,25 @@ def main():
         # Business opportunity analysis
         st.subheader("🎯 Top Business Opportunities")
         
-        # High-demand, high-price routes
-        high_value_routes = []
-        for route, data in popularity_data.items():
-            if data['weekly_searches'] > 20000 and data['avg_price'] > 400:
-                high_value_routes.append({
-                    'route': route,
-                    'searches': data['weekly_searches'],
-                    'price': data['avg_price'],
-                    'trend': data['demand_trend']
-                })
-        
-        if high_value_routes:
-            opportunity_df = pd.DataFrame(high_value_routes)
-            fig_opportunities = px.scatter(opportunity_df, x='searches', y='price', 
-                                         size='price', color='trend',
-                                         title="High-Value Route Opportunities",
-                                         labels={'searches': 'Weekly Searches', 'price': 'Average Price ($)'})
+        # High-demand, high-price routes, screened across all routes at once
+        popularity_df = build_popularity_frame(popularity_data)
+        opportunities = evaluate_rules(popularity_df, OPPORTUNITY_RULES)
+        high_value_routes = popularity_df.loc[opportunities['row']]
+        
+        if not high_value_routes.empty:
+            opportunity_df = high_value_routes.rename(columns={'weekly_searches': 'searches', 'avg_price': 'price', 'demand_trend': 'trend'})
+            fig_opportunities = figure_cache.get(
+                'opportunities', opportunity_df[['route', 'searches', 'price', 'trend']],
+                lambda df: px.scatter(drop_unused_categories(df), x='searches', y='price',
+                                      size='price', color='trend',
+                                      title="High-Value Route Opportunities",
+                                      labels={'searches': 'Weekly Searches', 'price': 'Average Price ($)'},
+                                      hover_name='route')
+            )
             st.plotly_chart(fig_opportunities, use_container_width=True)
+            
+            for message in opportunities['message']:
+                st.markdown(f"• {message}")
         
         # Seasonal planning
         st.subheader("📅 Seasonal Planning Recommendations")
@@ -403,6 +359,10 @@ def main():
         for tip in tips:
             st.markdown(f"• {tip}")
     
+    st.caption(f"🖼️ Figure cache: {figure_cache.reuse_rate:.0%} of charts this session reused or patched "
+               f"({figure_cache.stats['reused']} reused, {figure_cache.stats['patched']} patched, "
+               f"{figure_cache.stats['rebuilt']} rebuilt)")
+    
     # Footer
     st.markdown("---")
     st.markdown("""
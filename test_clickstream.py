@@ -0,0 +1,135 @@
+import json
+import math
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from clickstream import (ClickstreamDataSource, ClickstreamSketches, CountMinSketch, HyperLogLog, load_directory,
+                         measure_route_popularity)
+from data_sources import SimulatedDataSource
+
+
+def events_frame(rows):
+    return pd.DataFrame(rows, columns=['ts', 'event', 'origin', 'destination', 'user_id'])
+
+
+def write_events(path, rows, mode='w'):
+    with open(path, mode) as log:
+        for ts, event, origin, destination, user_id in rows:
+            log.write(json.dumps({'ts': ts, 'event': event, 'origin': origin,
+                                  'destination': destination, 'user_id': user_id}) + '\n')
+
+
+def test_count_min_never_undercounts_and_stays_close():
+    rng = np.random.default_rng(1)
+    keys = np.array([f"route-{i}" for i in range(500)], dtype=object)
+    counts = rng.integers(1, 1000, len(keys))
+    sketch = CountMinSketch()
+    sketch.add(keys, counts)
+
+    estimates = sketch.estimate(keys)
+    assert (estimates >= counts).all()
+    # width 2048 keeps the overestimate within e / width of the total in nearly every case
+    assert ((estimates - counts) <= np.e / sketch.width * counts.sum()).mean() > 0.99
+
+
+def test_count_min_merge_equals_adding_everything():
+    keys = np.array(['a', 'b', 'c'], dtype=object)
+    left, right, both = CountMinSketch(), CountMinSketch(), CountMinSketch()
+    left.add(keys, [1, 2, 3])
+    right.add(keys, [10, 20, 30])
+    both.add(keys, [11, 22, 33])
+    left.merge(right)
+    assert (left.table == both.table).all()
+
+
+def test_hyperloglog_accuracy():
+    for true_count in (50, 5000, 200000):
+        users = HyperLogLog()
+        users.add_hashes(pd.util.hash_array(np.arange(true_count).astype(str).astype(object)))
+        # Standard error is about 1.6% at precision 12; allow four of them
+        assert abs(users.estimate() - true_count) / true_count < 0.065
+
+
+def test_hyperloglog_merge_counts_overlap_once():
+    hashes = pd.util.hash_array(np.arange(20000).astype(str).astype(object))
+    left, right = HyperLogLog(), HyperLogLog()
+    left.add_hashes(hashes[:12000])
+    right.add_hashes(hashes[8000:])
+    left.merge(right)
+    assert abs(left.estimate() - 20000) / 20000 < 0.065
+
+
+def test_sketches_split_by_week_and_average_full_weeks_before_now():
+    sketches = ClickstreamSketches()
+    sketches.add_events(events_frame(
+        [('2026-10-05T09:00:00', 'search', 'Sydney', 'Perth', 'u1')] * 8 +
+        [('2026-10-12T09:00:00', 'search', 'Sydney', 'Perth', f'u{i}') for i in range(4)] +
+        [('2026-10-12T10:00:00', 'booking', 'Sydney', 'Perth', 'u1')] * 2 +
+        [('2026-10-19T09:00:00', 'search', 'Sydney', 'Perth', 'u9')] * 50
+    ))
+    assert sorted(sketches.windows) == ['2026-W41', '2026-W42', '2026-W43']
+
+    # The current week, W43, is still filling up and is left out
+    now = datetime(2026, 10, 20)
+    popularity = sketches.route_popularity(['Sydney → Perth', 'Perth → Sydney'], weeks=2, now=now)
+    assert popularity['Sydney → Perth'] == {'weekly_searches': 6, 'bookings': 1, 'unique_searchers': 4}
+    assert popularity['Perth → Sydney']['weekly_searches'] == 0
+
+    assert sketches.route_popularity(['Sydney → Perth'], weeks=1, now=now)['Sydney → Perth']['weekly_searches'] == 4
+    # Weeks without events count as zero
+    assert sketches.route_popularity(['Sydney → Perth'], weeks=4, now=now)['Sydney → Perth']['weekly_searches'] == 3
+
+
+def test_logs_that_stopped_long_ago_are_not_current_popularity():
+    sketches = ClickstreamSketches()
+    sketches.add_events(events_frame([('2026-07-06T09:00:00', 'search', 'Sydney', 'Perth', 'u1')] * 100))
+    popularity = sketches.route_popularity(['Sydney → Perth'], weeks=4, now=datetime(2026, 10, 20))
+    assert popularity['Sydney → Perth'] == {'weekly_searches': 0, 'bookings': 0, 'unique_searchers': 0}
+
+
+def test_rolling_aggregate_reads_only_new_lines_and_drops_old_weeks(tmp_path):
+    log = os.path.join(tmp_path, 'events.jsonl')
+    now = datetime(2026, 10, 13)
+    write_events(log, [('2026-09-01T09:00:00', 'search', 'Sydney', 'Perth', 'u1')] +
+                 [(f'2026-10-0{day}T09:00:00', 'search', 'Sydney', 'Perth', 'u1') for day in range(1, 5)])
+    sketches = load_directory(str(tmp_path), weeks=2, now=now)
+    assert sorted(sketches.windows) == ['2026-W40']
+
+    # A partly written line is left until it is complete
+    write_events(log, [('2026-10-06T09:00:00', 'search', 'Sydney', 'Perth', 'u2')] * 2 +
+                 [('2026-10-12T09:00:00', 'search', 'Sydney', 'Perth', 'u2')], mode='a')
+    with open(log, 'a') as partial:
+        partial.write('{"ts": "2026-10-05T10:00')
+    popularity = measure_route_popularity(str(tmp_path), ['Sydney → Perth'], weeks=2, now=now)['Sydney → Perth']
+    assert sorted(sketches.windows) == ['2026-W40', '2026-W41', '2026-W42']
+    assert popularity['weekly_searches'] == 3  # (4 + 2) / 2, counted once despite the second read
+
+
+def test_rolling_aggregate_rebuilds_when_a_log_is_rewritten(tmp_path):
+    log = os.path.join(tmp_path, 'events.jsonl')
+    now = datetime(2026, 10, 13)
+    write_events(log, [('2026-10-05T09:00:00', 'search', 'Sydney', 'Perth', f'u{i}') for i in range(10)])
+    assert measure_route_popularity(str(tmp_path), ['Sydney → Perth'], weeks=1, now=now)['Sydney → Perth']['weekly_searches'] == 10
+
+    write_events(log, [('2026-10-05T09:00:00', 'search', 'Sydney', 'Perth', 'u1')])
+    assert measure_route_popularity(str(tmp_path), ['Sydney → Perth'], weeks=1, now=now)['Sydney → Perth']['weekly_searches'] == 1
+
+
+def test_empty_directory_has_zero_popularity(tmp_path):
+    popularity = measure_route_popularity(str(tmp_path), ['Sydney → Perth'])
+    assert popularity == {'Sydney → Perth': {'weekly_searches': 0, 'bookings': 0, 'unique_searchers': 0}}
+
+
+def test_conversion_rate_is_recomputed_from_measured_counts(tmp_path):
+    ts = (datetime.now() - timedelta(days=8)).strftime('%Y-%m-%dT%H:%M:%S')
+    write_events(os.path.join(tmp_path, 'events.jsonl'),
+                 [(ts, 'search', 'Sydney', 'Melbourne', f'u{i}') for i in range(40)] +
+                 [(ts, 'booking', 'Sydney', 'Melbourne', f'u{i}') for i in range(8)])
+    backend = SimulatedDataSource(delay_range=(0, 0), include_conversion_rate=True)
+    popularity = ClickstreamDataSource(backend, str(tmp_path)).get_route_popularity()
+
+    assert popularity['Sydney → Melbourne']['conversion_rate'] == 20.0
+    assert math.isnan(popularity['Melbourne → Sydney']['conversion_rate'])
@@ -0,0 +1,72 @@
+import random
+from datetime import date, timedelta
+
+import numpy as np
+
+from fare_index import FareIndex, FareSegmentTree
+
+START = date(2026, 11, 1)
+
+
+def brute_force_cheapest(fares, start, end):
+    known = [(day, price) for day, price in fares.items() if start <= day <= end]
+    if not known:
+        return None
+    # Ties go to the earlier date, as in the tree
+    return min(known, key=lambda item: (item[1], item[0]))
+
+
+def test_query_matches_brute_force():
+    rng = random.Random(3)
+    tree = FareSegmentTree(START, days=50)
+    fares = {}
+    for _ in range(300):
+        day = START + timedelta(days=rng.randrange(tree.size))
+        fares[day] = float(rng.randint(100, 140))
+        tree.update(day, fares[day])
+
+        low, high = sorted(rng.randrange(-5, tree.size + 5) for _ in range(2))
+        start, end = START + timedelta(days=low), START + timedelta(days=high)
+        assert tree.query(start, end) == brute_force_cheapest(fares, start, end)
+
+
+def test_query_with_no_known_fares():
+    tree = FareSegmentTree(START)
+    assert tree.query(START, START + timedelta(days=10)) is None
+    tree.update(START + timedelta(days=20), 250)
+    assert tree.query(START, START + timedelta(days=10)) is None
+
+
+def test_fares_fill_unknown_dates_with_infinity():
+    tree = FareSegmentTree(START, days=8)
+    tree.update(START + timedelta(days=2), 199)
+    fares = tree.fares(START - timedelta(days=1), START + timedelta(days=10))
+    assert len(fares) == 12
+    assert fares[3] == 199
+    assert np.isinf(np.delete(fares, 3)).all()
+
+
+def test_index_grows_to_cover_new_dates():
+    index = FareIndex()
+    fares = {}
+    rng = random.Random(5)
+    for _ in range(100):
+        day = START + timedelta(days=rng.randrange(-200, 400))
+        fares[day] = float(rng.randint(100, 900))
+        index.add({'route': 'Sydney → Perth', 'date': day.strftime("%Y-%m-%d"), 'min_price': fares[day]})
+
+    tree = index.trees['Sydney → Perth']
+    assert tree.start_date <= min(fares) and max(fares) <= tree.end_date
+    # Growth is proportional to the dates covered, not exponential in the number of adds
+    assert tree.size <= 4 * ((max(fares) - min(fares)).days + 1)
+    for low, high in [(-200, 400), (-50, 50), (100, 101), (390, 399)]:
+        start, end = START + timedelta(days=low), START + timedelta(days=high)
+        assert index.cheapest('Sydney → Perth', start, end) == brute_force_cheapest(fares, start, end)
+
+
+def test_calendar_marks_unfetched_dates_as_missing():
+    index = FareIndex()
+    index.add({'route': 'Sydney → Perth', 'date': '2026-11-03', 'min_price': 320})
+    calendar = index.calendar('Sydney → Perth', START, START + timedelta(days=4))
+    assert list(calendar['min_price'].isna()) == [True, True, False, True, True]
+    assert index.calendar('Perth → Sydney', START, START + timedelta(days=4))['min_price'].isna().all()
@@ -0,0 +1,97 @@
+import pandas as pd
+import plotly.express as px
+
+from figure_cache import FigureCache, extend_traces
+
+TRENDS = pd.DataFrame({
+    'date': ['2026-10-01', '2026-10-01', '2026-10-02', '2026-10-02'],
+    'route': ['Sydney-Perth', 'Sydney-Melbourne', 'Sydney-Perth', 'Sydney-Melbourne'],
+    'price': [450.0, 300.0, 460.0, 310.0]
+})
+
+
+class CountingBuilder:
+    def __init__(self):
+        self.builds = 0
+
+    def __call__(self, data):
+        self.builds += 1
+        return px.line(data, x='date', y='price', color='route')
+
+
+def append_trends(fig, rows):
+    return extend_traces(fig, rows, x='date', y='price', color='route')
+
+
+def trace_points(fig):
+    return {trace.name: list(zip(trace.x, trace.y)) for trace in fig.data}
+
+
+def test_unchanged_data_reuses_the_figure():
+    cache, build = FigureCache(), CountingBuilder()
+    first = cache.get('trends', TRENDS, build, append_trends)
+    assert cache.get('trends', TRENDS.copy(), build, append_trends) is first
+    assert build.builds == 1
+    assert cache.stats == {'reused': 1, 'patched': 0, 'rebuilt': 1}
+
+
+def test_appended_rows_patch_the_matching_traces():
+    cache, build = FigureCache(), CountingBuilder()
+    fig = cache.get('trends', TRENDS, build, append_trends)
+    grown = pd.concat([TRENDS, pd.DataFrame({'date': ['2026-10-03'], 'route': ['Sydney-Perth'], 'price': [470.0]})],
+                      ignore_index=True)
+
+    assert cache.get('trends', grown, build, append_trends) is fig
+    assert build.builds == 1
+    assert cache.stats['patched'] == 1
+    # The patched figure matches one built from scratch
+    assert trace_points(fig) == trace_points(build(grown))
+
+
+def test_changed_rows_rebuild_the_figure():
+    cache, build = FigureCache(), CountingBuilder()
+    fig = cache.get('trends', TRENDS, build, append_trends)
+    changed = TRENDS.assign(price=TRENDS['price'] + 1)
+    assert cache.get('trends', changed, build, append_trends) is not fig
+    assert cache.get('trends', TRENDS.iloc[:2], build, append_trends) is not fig
+    assert build.builds == 3
+    assert cache.stats['patched'] == 0
+
+
+def test_new_colour_group_rebuilds_the_figure():
+    cache, build = FigureCache(), CountingBuilder()
+    fig = cache.get('trends', TRENDS, build, append_trends)
+    grown = pd.concat([TRENDS, pd.DataFrame({'date': ['2026-10-03'], 'route': ['Sydney-Brisbane'], 'price': [350.0]})],
+                      ignore_index=True)
+
+    rebuilt = cache.get('trends', grown, build, append_trends)
+    assert rebuilt is not fig
+    assert {trace.name for trace in rebuilt.data} == {'Sydney-Perth', 'Sydney-Melbourne', 'Sydney-Brisbane'}
+    assert cache.stats == {'reused': 0, 'patched': 0, 'rebuilt': 2}
+
+
+def test_growth_without_an_append_function_rebuilds():
+    cache, build = FigureCache(), CountingBuilder()
+    cache.get('trends', TRENDS.iloc[:2], build)
+    cache.get('trends', TRENDS, build)
+    assert build.builds == 2
+
+
+def test_keys_are_cached_separately_and_reuse_rate_counts_patches():
+    cache, build = FigureCache(), CountingBuilder()
+    cache.get('a', TRENDS, build, append_trends)
+    cache.get('b', TRENDS.iloc[:2], build, append_trends)
+    cache.get('a', TRENDS, build, append_trends)
+    cache.get('b', TRENDS, build, append_trends)
+    assert cache.stats == {'reused': 1, 'patched': 1, 'rebuilt': 2}
+    assert cache.reuse_rate == 0.5
+    assert FigureCache().reuse_rate == 0.0
+
+
+def test_extend_traces_without_colour_needs_a_single_trace():
+    fig = px.bar(pd.DataFrame({'route': ['a'], 'price': [1.0]}), x='route', y='price')
+    assert extend_traces(fig, pd.DataFrame({'route': ['b'], 'price': [2.0]}), x='route', y='price')
+    assert list(fig.data[0].x) == ['a', 'b']
+
+    two_traces = px.line(TRENDS, x='date', y='price', color='route')
+    assert not extend_traces(two_traces, TRENDS.iloc[:1], x='date', y='price')
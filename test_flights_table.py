@@ -0,0 +1,94 @@
+import random
+
+import numpy as np
+
+from flights_table import FlightTable
+from schema import AIRLINES
+
+AVAILABILITY = ['Available', 'Limited', 'Sold Out']
+
+
+def random_flights(count, seed):
+    rng = random.Random(seed)
+    return [{
+        'airline': rng.choice(AIRLINES),
+        'price': float(rng.randint(100, 130)),
+        'departure_time': f"{rng.randint(6, 22):02d}:{rng.choice(['00', '15', '30', '45'])}",
+        'duration': '1h 30m',
+        'aircraft': 'Boeing 737',
+        'availability': rng.choice(AVAILABILITY)
+    } for _ in range(count)]
+
+
+def minutes(departure_time):
+    hours, mins = departure_time.split(':')
+    return int(hours) * 60 + int(mins)
+
+
+def brute_force(flights, airlines=None, price_range=None, departure_range=None, availability=None,
+                sort_by='price', ascending=True):
+    rows = [row for row, flight in enumerate(flights)
+            if (airlines is None or flight['airline'] in airlines)
+            and (price_range is None or price_range[0] <= flight['price'] <= price_range[1])
+            and (departure_range is None or departure_range[0] <= minutes(flight['departure_time']) <= departure_range[1])
+            and (availability is None or flight['availability'] in availability)]
+    keys = {
+        'price': lambda row: flights[row]['price'],
+        'departure': lambda row: minutes(flights[row]['departure_time']),
+        'airline': lambda row: (flights[row]['airline'], flights[row]['price'])
+    }
+    # Stable sorts keep fetch order among ties, and descending is the exact reverse
+    rows.sort(key=keys[sort_by])
+    return rows if ascending else rows[::-1]
+
+
+def test_query_matches_brute_force():
+    rng = random.Random(2)
+    for seed in range(30):
+        flights = random_flights(rng.randint(0, 40), seed)
+        table = FlightTable(flights)
+        for _ in range(10):
+            low, high = sorted(rng.randint(95, 135) for _ in range(2))
+            early, late = sorted(rng.randint(300, 1400) for _ in range(2))
+            filters = {
+                'airlines': rng.choice([None, rng.sample(AIRLINES, rng.randint(0, 3))]),
+                'price_range': rng.choice([None, (low, high)]),
+                'departure_range': rng.choice([None, (early, late)]),
+                'availability': rng.choice([None, rng.sample(AVAILABILITY, rng.randint(1, 2))]),
+                'sort_by': rng.choice(['price', 'departure', 'airline']),
+                'ascending': rng.choice([True, False])
+            }
+            assert list(table.query(**filters)) == brute_force(flights, **filters)
+
+
+def test_airlines_sort_by_name_not_category_order():
+    flights = [dict(random_flights(1, 0)[0], airline=airline, price=100.0) for airline in AIRLINES]
+    table = FlightTable(flights)
+    assert table.airlines == sorted(AIRLINES)
+    assert list(table.frame.iloc[table.query(sort_by='airline')]['airline']) == sorted(AIRLINES)
+    assert list(table.frame.iloc[table.query(sort_by='airline', ascending=False)]['airline']) == sorted(AIRLINES)[::-1]
+
+
+def test_price_range_bounds_are_inclusive():
+    flights = [dict(random_flights(1, 0)[0], price=price) for price in (100.0, 110.0, 120.0, 130.0)]
+    table = FlightTable(flights)
+    assert list(table.query(price_range=(110, 120))) == [1, 2]
+    assert table.price_bounds == (100, 130)
+    assert len(table.query(price_range=(121, 129))) == 0
+
+
+def test_pages_slice_the_matching_rows():
+    flights = random_flights(45, 4)
+    table = FlightTable(flights)
+    rows = table.query(sort_by='departure')
+    pages = [table.page(rows, number, 20) for number in (1, 2, 3)]
+    assert [len(page) for page in pages] == [20, 20, 5]
+    assert list(np.concatenate([page['departure_time'] for page in pages])) == \
+        list(table.frame.iloc[rows]['departure_time'])
+
+
+def test_empty_table():
+    table = FlightTable([])
+    assert len(table.query(airlines=['Qantas'], price_range=(0, 1000))) == 0
+    assert table.price_bounds == (0, 0)
+    assert table.departure_bounds == (0, 0)
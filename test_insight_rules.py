@@ -0,0 +1,84 @@
+import random
+
+import pandas as pd
+
+from insight_rules import OPPORTUNITY_RULES, ROUTE_INSIGHT_RULES, evaluate_rules, render_template
+
+
+def branch_insights(data):
+    """Route insights as generate_insights built them before the rule engine"""
+    insights = []
+    if data['demand_level'] == 'High':
+        insights.append(f"🔥 **High Demand Alert**: {data['route']} shows strong booking activity")
+        insights.append(f"💰 **Pricing Opportunity**: Average price ${data['avg_price']:.0f} indicates premium market")
+    elif data['demand_level'] == 'Medium':
+        insights.append(f"📊 **Stable Market**: {data['route']} has moderate demand patterns")
+        insights.append(f"⚖️ **Balanced Pricing**: Price range ${data['min_price']:.0f}-${data['max_price']:.0f} shows competitive market")
+    else:
+        insights.append(f"📉 **Lower Demand**: {data['route']} may have capacity for promotional pricing")
+        insights.append(f"🎯 **Opportunity**: Consider targeting this route for hostel marketing")
+    insights.append(f"✈️ **Flight Availability**: {data['total_flights']} flights available")
+    insights.append(f"⏰ **Peak Times**: Best booking windows are {data['peak_times']}")
+    return insights
+
+
+def random_routes(count, seed=11):
+    rng = random.Random(seed)
+    return [{
+        'route': f"City{i} → City{i + 1}",
+        'avg_price': rng.uniform(100, 900),
+        'min_price': rng.randint(100, 400),
+        'max_price': rng.randint(400, 900),
+        'total_flights': rng.randint(3, 15),
+        'demand_level': rng.choice(['High', 'Medium', 'Low']),
+        'peak_times': '08:00-10:00, 17:00-19:00',
+        'weekly_searches': rng.randint(5000, 50000),
+    } for i in range(count)]
+
+
+def test_route_insights_match_the_old_branches():
+    for data in random_routes(30):
+        messages = evaluate_rules(pd.DataFrame([data]), ROUTE_INSIGHT_RULES)['message']
+        assert list(messages) == branch_insights(data)
+
+
+def test_rules_are_evaluated_across_all_rows_in_rule_order():
+    routes = random_routes(30)
+    results = evaluate_rules(pd.DataFrame(routes), ROUTE_INSIGHT_RULES)
+    # Every route gets two demand messages plus availability and peak times
+    assert len(results) == 4 * len(routes)
+    assert list(results['rule_order']) == sorted(results['rule_order'])
+    for row, group in results.groupby('row'):
+        assert sorted(group['message']) == sorted(branch_insights(routes[row]))
+
+
+def test_opportunities_match_the_old_screen_ranked_by_searches():
+    routes = random_routes(50)
+    frame = pd.DataFrame(routes)
+    results = evaluate_rules(frame, OPPORTUNITY_RULES)
+
+    expected = [data for data in routes if data['weekly_searches'] > 20000 and data['avg_price'] > 400]
+    expected.sort(key=lambda data: -data['weekly_searches'])
+    assert [frame.loc[row, 'route'] for row in results['row']] == [data['route'] for data in expected]
+    assert list(results['rank']) == list(range(1, len(expected) + 1))
+    assert results['message'].iloc[0] == (f"{expected[0]['route']}: {expected[0]['weekly_searches']:,} weekly searches "
+                                          f"at ${expected[0]['avg_price']:.0f}")
+
+
+def test_top_and_ascending_ranking():
+    frame = pd.DataFrame({'route': list('abcde'), 'price': [5.0, 1.0, 4.0, 2.0, 3.0]})
+    rules = [{'name': 'cheapest', 'rank_by': 'price', 'ascending': True, 'top': 2, 'template': '{route}'}]
+    assert list(evaluate_rules(frame, rules)['message']) == ['b', 'd']
+
+
+def test_no_matches_and_no_rules():
+    frame = pd.DataFrame(random_routes(5))
+    assert evaluate_rules(frame, [{'name': 'none', 'when': 'total_flights > 100', 'template': '{route}'}]).empty
+    assert list(evaluate_rules(frame, []).columns) == ['row', 'rule', 'rule_order', 'rank', 'message']
+
+
+def test_render_template_formats_match_str_format():
+    frame = pd.DataFrame({'name': ['x', 'y'], 'price': [12.345, 7.5], 'count': [1234, 56789]})
+    template = "{name}: ${price:.1f} from {count:,} searches"
+    expected = [template.format(**row) for row in frame.to_dict('records')]
+    assert list(render_template(frame, template)) == expected
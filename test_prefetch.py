@@ -0,0 +1,143 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from data_sources import DataSourceBackend
+from prefetch import Prefetcher
+from route_cache import RouteCache, get_route_data
+
+TRAVEL_DATE = datetime.now().date() + timedelta(days=10)
+
+
+class StubSource(DataSourceBackend):
+    """Counts fetches and can hold them until released"""
+
+    def __init__(self, popularity=None):
+        super().__init__()
+        self.popularity = popularity or {}
+        self.calls = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def scrape_flight_data(self, origin, destination, date):
+        self.release.wait(5)
+        self.calls.append((origin, destination, date))
+        return {'route': f"{origin} → {destination}", 'date': date, 'min_price': 100}
+
+    def get_route_popularity(self):
+        return self.popularity
+
+    def get_price_trends(self, days=30):
+        return pd.DataFrame()
+
+
+def make_prefetcher(tmp_path, source=None, **options):
+    source = source or StubSource()
+    route_cache = RouteCache(str(tmp_path / 'routes.sqlite3'))
+    return Prefetcher(source, route_cache, **options), source, route_cache
+
+
+def wait_for_prefetches(prefetcher):
+    deadline = time.time() + 5
+    while prefetcher._in_flight and time.time() < deadline:
+        time.sleep(0.01)
+
+
+def day(offset):
+    return (TRAVEL_DATE + timedelta(days=offset)).strftime("%Y-%m-%d")
+
+
+def test_candidates_are_nearby_dates_reverse_route_then_popular_destinations(tmp_path):
+    source = StubSource({
+        'Sydney → Perth': {'weekly_searches': 900},
+        'Sydney → Melbourne': {'weekly_searches': 5000},
+        'Sydney → Brisbane': {'weekly_searches': 3000},
+        'Melbourne → Perth': {'weekly_searches': 9000},
+    })
+    prefetcher, _, _ = make_prefetcher(tmp_path, source, days=1, popular_destinations=2)
+    assert prefetcher.candidates('Sydney', 'Melbourne', TRAVEL_DATE) == [
+        ('Sydney', 'Melbourne', day(1)), ('Sydney', 'Melbourne', day(-1)),
+        ('Melbourne', 'Sydney', day(0)),
+        # The selected destination is one of the two most popular, so only one other remains
+        ('Sydney', 'Brisbane', day(0)),
+    ]
+
+
+def test_candidates_skip_past_dates(tmp_path):
+    prefetcher, _, _ = make_prefetcher(tmp_path, days=2, popular_destinations=0)
+    today = datetime.now().date()
+    dates = [key[2] for key in prefetcher.candidates('Sydney', 'Perth', today)]
+    assert min(dates) == today.strftime("%Y-%m-%d")
+    assert len(dates) == 3
+
+
+def test_prefetch_stays_within_budget_and_skips_cached(tmp_path):
+    prefetcher, source, route_cache = make_prefetcher(tmp_path, days=3, popular_destinations=0, max_fetches=2)
+    route_cache.put('Sydney', 'Perth', day(1), {'min_price': 1})
+    prefetcher.prefetch('Sydney', 'Perth', TRAVEL_DATE)
+    wait_for_prefetches(prefetcher)
+
+    assert sorted(source.calls) == [('Sydney', 'Perth', day(-1)), ('Sydney', 'Perth', day(2))]
+    assert route_cache.get('Sydney', 'Perth', day(2)) is not None
+    assert prefetcher.stats['prefetched'] == 2
+
+
+def test_only_lookups_served_by_a_prefetch_count_as_hits(tmp_path):
+    prefetcher, source, route_cache = make_prefetcher(tmp_path, days=1, popular_destinations=0)
+    prefetcher.prefetch('Sydney', 'Perth', TRAVEL_DATE)
+    wait_for_prefetches(prefetcher)
+
+    get_route_data(source, route_cache, 'Sydney', 'Perth', day(1), prefetcher)
+    get_route_data(source, route_cache, 'Sydney', 'Perth', day(5), prefetcher)
+    # Looking the same selection up again is an ordinary cache hit
+    get_route_data(source, route_cache, 'Sydney', 'Perth', day(1), prefetcher)
+    assert prefetcher.stats['lookups'] == 3
+    assert prefetcher.stats['hits'] == 1
+
+
+def test_selection_being_prefetched_is_awaited_not_fetched_twice(tmp_path):
+    prefetcher, source, route_cache = make_prefetcher(tmp_path, days=1, popular_destinations=0)
+    source.release.clear()
+    prefetcher.prefetch('Sydney', 'Perth', TRAVEL_DATE)
+    assert prefetcher.pending(('Sydney', 'Perth', day(1))) is not None
+
+    threading.Timer(0.2, source.release.set).start()
+    route_data = get_route_data(source, route_cache, 'Sydney', 'Perth', day(1), prefetcher)
+    wait_for_prefetches(prefetcher)
+
+    assert route_data['date'] == day(1)
+    assert source.calls.count(('Sydney', 'Perth', day(1))) == 1
+    assert prefetcher.stats['hits'] == 1
+
+
+def test_prefetch_finishing_after_the_first_lookup_is_not_fetched_again(tmp_path):
+    prefetcher, source, route_cache = make_prefetcher(tmp_path)
+    route_cache.put('Sydney', 'Perth', day(0), {'date': day(0)})
+    lookups = []
+    cache_get = route_cache.get
+
+    def get_missing_first(*args, **kwargs):
+        # The first lookup misses, as if the prefetch stored its result just after it
+        lookups.append(args)
+        return None if len(lookups) == 1 else cache_get(*args, **kwargs)
+
+    route_cache.get = get_missing_first
+    assert get_route_data(source, route_cache, 'Sydney', 'Perth', day(0), prefetcher) == {'date': day(0)}
+    assert source.calls == []
+
+
+def test_past_and_expired_prefetches_are_forgotten(tmp_path):
+    prefetcher, _, route_cache = make_prefetcher(tmp_path, days=0, popular_destinations=0)
+    yesterday = (datetime.now().date() - timedelta(days=1)).strftime("%Y-%m-%d")
+    prefetcher._prefetched = {
+        ('Sydney', 'Perth', yesterday): time.time(),
+        ('Sydney', 'Perth', day(0)): time.time() - route_cache.max_age - 1,
+        ('Sydney', 'Perth', day(1)): time.time(),
+    }
+    prefetcher.prefetch('Adelaide', 'Hobart', TRAVEL_DATE)
+    wait_for_prefetches(prefetcher)
+    assert ('Sydney', 'Perth', day(1)) in prefetcher._prefetched
+    assert ('Sydney', 'Perth', yesterday) not in prefetcher._prefetched
+    assert ('Sydney', 'Perth', day(0)) not in prefetcher._prefetched
@@ -0,0 +1,61 @@
+import pandas as pd
+import pytest
+
+from schema import (AIRLINE_DTYPE, ROUTE_DTYPE, build_flights_frame, build_popularity_frame, build_trends_frame,
+                    drop_unused_categories)
+
+FLIGHT = {'airline': 'Qantas', 'price': 320, 'departure_time': '08:15', 'duration': '1h 30m',
+          'aircraft': 'Boeing 737', 'availability': 'Limited'}
+POPULARITY = {'weekly_searches': 25000, 'bookings': 3000, 'avg_price': 420.5,
+              'demand_trend': 'Stable', 'peak_season': 'Summer'}
+
+
+def test_flights_frame_uses_shared_categories():
+    frame = build_flights_frame([FLIGHT, {**FLIGHT, 'airline': 'Jetstar', 'price': 199.5}])
+    assert frame['airline'].dtype == AIRLINE_DTYPE
+    assert frame['price'].dtype == 'float64'
+    assert list(frame['airline']) == ['Qantas', 'Jetstar']
+
+
+def test_unknown_category_raises_value_error():
+    with pytest.raises(ValueError, match="Unknown airline values: Emirates"):
+        build_flights_frame([FLIGHT, {**FLIGHT, 'airline': 'Emirates'}])
+    with pytest.raises(ValueError, match="Unknown route values"):
+        build_popularity_frame({'Sydney → Atlantis': POPULARITY})
+
+
+def test_missing_column_raises_value_error():
+    flight = dict(FLIGHT)
+    del flight['availability']
+    with pytest.raises(ValueError, match="Missing columns: availability"):
+        build_flights_frame([flight])
+
+
+def test_empty_input_gives_typed_empty_frame():
+    frame = build_flights_frame([])
+    assert frame.empty
+    assert frame['airline'].dtype == AIRLINE_DTYPE
+
+
+def test_popularity_frame_types_optional_columns_when_present():
+    frame = build_popularity_frame({'Sydney → Perth': POPULARITY})
+    assert frame['route'].dtype == ROUTE_DTYPE
+    assert 'conversion_rate' not in frame
+
+    frame = build_popularity_frame({'Sydney → Perth': {**POPULARITY, 'conversion_rate': 12, 'unique_searchers': 900}})
+    assert frame['conversion_rate'].dtype == 'float64'
+    assert frame['unique_searchers'].dtype == 'int64'
+
+
+def test_trends_frame_dtypes():
+    frame = build_trends_frame([{'date': pd.Timestamp('2026-10-01'), 'route': 'Sydney-Perth', 'price': 450.0,
+                                 'demand_score': 80, 'bookings': 500}])
+    assert frame['date'].dtype == 'datetime64[ns]'
+    assert frame['demand_score'].dtype == 'int16'
+    assert frame['bookings'].dtype == 'int32'
+
+
+def test_drop_unused_categories_keeps_only_present_values():
+    frame = drop_unused_categories(build_flights_frame([FLIGHT]))
+    assert list(frame['airline'].cat.categories) == ['Qantas']
+    assert list(frame['availability'].cat.categories) == ['Limited']